@@ -1,9 +1,13 @@
-from typing import Generator, Optional
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Generator, Optional, Union
 from fastapi import Depends, HTTPException, status, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..db.session import SessionLocal
+from ..db.async_session import AsyncReadSessionLocal, AsyncSessionLocal
+from ..db.session import ReadSessionLocal, SessionLocal
 from ..core.security import decode_token
-from ..models.user import User, UserRole
+from ..models.user import UserRole
+from ..services.principals import Principal, resolve
 
 def _extract_token(request: Request) -> Optional[str]:
     # 1) Authorization: Bearer <token>
@@ -25,20 +29,58 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+def get_read_db() -> Generator[Session, None, None]:
+    """Sessão do pool de leitura; use em rotas que não gravam."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Sessão das rotas async: AsyncSession com DB_ASYNC, senão Session síncrona
+DbSession = Union[Session, AsyncSession]
+
+
+@asynccontextmanager
+async def _session(async_factory, sync_factory) -> AsyncIterator[DbSession]:
+    # Context manager (não `async for`): exceções da rota chegam aqui e a sessão fecha na hora
+    if async_factory is not None:
+        async with async_factory() as db:
+            yield db
+        return
+    db = sync_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_session() -> AsyncGenerator[DbSession, None]:
+    """Sessão de escrita para rotas async: AsyncSession com DB_ASYNC, senão Session (use com run_db)."""
+    async with _session(AsyncSessionLocal, SessionLocal) as db:
+        yield db
+
+
+async def get_read_session() -> AsyncGenerator[DbSession, None]:
+    """Como get_session, no pool de leitura."""
+    async with _session(AsyncReadSessionLocal, ReadSessionLocal) as db:
+        yield db
+
+
+def get_current_user(request: Request, db: Session = Depends(get_read_db)) -> Principal:
     token = _extract_token(request)
     payload = decode_token(token or "")
     if payload is None or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
-    email = payload["sub"]
-    user: Optional[User] = db.query(User).filter(User.email == email).first()
-    if user is None:
+    principal = resolve(db, payload)
+    if principal is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuário não encontrado")
-    return user
+    return principal
 
 
 def require_roles(*roles: UserRole):
-    def wrapper(user: User = Depends(get_current_user)) -> User:
+    def wrapper(user: Principal = Depends(get_current_user)) -> Principal:
         if roles and user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado")
         return user
@@ -2,33 +2,55 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from ...schemas.user import UserCreate, UserOut, LoginRequest, Token
 from ...models.user import User, UserRole
-from ...core.security import hash_password, verify_password, create_access_token
+from ...core.security import (
+    PasswordHashOverloaded,
+    create_access_token,
+    hash_password_async,
+    verify_and_update_password_async,
+)
 from fastapi.responses import JSONResponse
-from ..deps import get_db
+from starlette.concurrency import run_in_threadpool
+from ...db.async_session import run_db
+from ..deps import DbSession, get_db, get_session
 from datetime import datetime, timedelta, timezone
 from jose import jwt
+from ...services.principals import token_claims
+from ...services.rate_limit import login_limiter
+from ...services.webhooks import webhooks
+import json
+import os
+
+router = APIRouter()
+
+
 @router.post("/logout")
 def logout():
     resp = JSONResponse(content={"message": "ok"})
     resp.set_cookie(key="access_token", value="", max_age=0, expires=0, path="/")
     return resp
-import json
-import os
 
-router = APIRouter()
-_attempts: dict[str, list[float]] = {}
-_lockout_until: dict[str, float] = {}
 
+def _find_user(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
 
-@router.post("/register", response_model=UserOut)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user_in.email).first()
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email já cadastrado")
+
+def _any_locked(*keys: str) -> bool:
+    return any(login_limiter.is_locked(key) for key in keys)
+
+
+def _hash_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, tente novamente",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _create_user(db: Session, user_in: UserCreate, hashed_password: str) -> User:
     user = User(
         name=user_in.name,
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=hashed_password,
         role=user_in.role or UserRole.operador,
     )
     db.add(user)
@@ -37,49 +59,54 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
     return user
 
 
+def _set_password(db: Session, user_id: int, hashed_password: str) -> None:
+    user = db.get(User, user_id)
+    user.hashed_password = hashed_password
+    db.add(user)
+    db.commit()
+
+
+# bcrypt roda em threads dedicadas (core.security); as rotas abaixo só aguardam
+@router.post("/register", response_model=UserOut)
+async def register(user_in: UserCreate, db: DbSession = Depends(get_session)):
+    if await run_db(db, _find_user, user_in.email):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email já cadastrado")
+    try:
+        hashed = await hash_password_async(user_in.password)
+    except PasswordHashOverloaded:
+        raise _hash_overloaded()
+    return await run_db(db, _create_user, user_in, hashed)
+
+
 @router.post("/login", response_model=Token)
-def login(data: LoginRequest, request: Request, db: Session = Depends(get_db)):
+async def login(data: LoginRequest, request: Request, db: DbSession = Depends(get_session)):
     from ...core.config import settings
 
     ip = request.client.host if request.client else "unknown"
     key_ip = f"ip:{ip}"
     key_user = f"user:{data.email.lower()}"
-    now = datetime.now(timezone.utc).timestamp()
-
-    # Verifica lockout
-    for key in (key_ip, key_user):
-        until = _lockout_until.get(key, 0)
-        if now < until:
-            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Tente novamente mais tarde")
-
-    window = settings.LOGIN_WINDOW_SECONDS
-    max_attempts = settings.LOGIN_MAX_ATTEMPTS
-    lockout = settings.LOGIN_LOCKOUT_SECONDS
-
-    def _register_attempt(k: str, success: bool) -> None:
-        arr = _attempts.setdefault(k, [])
-        cutoff = now - window
-        arr[:] = [t for t in arr if t >= cutoff]
-        if not success:
-            arr.append(now)
-            if len(arr) >= max_attempts:
-                _lockout_until[k] = now + lockout
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not verify_password(data.password, user.hashed_password):
-        _register_attempt(key_ip, False)
-        _register_attempt(key_user, False)
+
+    # Verifica lockout (backend SQLite consulta o arquivo: uma ida ao threadpool para as duas chaves)
+    if await run_in_threadpool(_any_locked, key_ip, key_user):
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Tente novamente mais tarde")
+
+    user = await run_db(db, _find_user, data.email)
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await verify_and_update_password_async(data.password, user.hashed_password)
+        except PasswordHashOverloaded:
+            raise _hash_overloaded()
+    if not valid:
+        # Backend SQLite pode esperar pelo lock de escrita: fora do event loop
+        await run_in_threadpool(login_limiter.failure, key_ip)
+        await run_in_threadpool(login_limiter.failure, key_user)
         import logging
         logging.getLogger("auth").warning(
             f"login_failed ip={ip} user={data.email}"
         )
-        # webhook opcional
-        from ...core.config import settings
-        if settings.WEBHOOK_URL:
-            try:
-                import httpx
-                httpx.post(settings.WEBHOOK_URL, json={"event": "login_failed", "ip": ip, "user": data.email})
-            except Exception:
-                logging.getLogger("auth").debug("webhook_failed")
+        # webhook opcional: só enfileira, o envio não atrasa a resposta
+        webhooks.enqueue("login_failed", ip=ip, user=data.email)
         # métrica
         try:
             from ...main import login_fail_counter
@@ -87,16 +114,18 @@ def login(data: LoginRequest, request: Request, db: Session = Depends(get_db)):
         except Exception:
             pass
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciais inválidas")
-    _attempts.pop(key_user, None)
-    _lockout_until.pop(key_user, None)
-    token = create_access_token(subject=user.email)
+    if new_hash:
+        # Custo do bcrypt mudou: regrava o hash com o custo atual
+        await run_db(db, _set_password, user.id, new_hash)
+    await run_in_threadpool(login_limiter.reset, key_user)
+    token = create_access_token(subject=user.email, claims=token_claims(user))
     # Define cookie HttpOnly para reduzir risco XSS
     response = JSONResponse(content=Token(access_token=token).model_dump())
     response.set_cookie(
         key="access_token",
         value=token,
         httponly=True,
-        secure=False if not __import__('app.core.config', fromlist=['settings']).core.config.settings.COOKIE_SECURE else True,
+        secure=settings.COOKIE_SECURE,
         samesite="Lax",
         max_age=60 * 60 * 2,
         path="/",
@@ -125,7 +154,7 @@ def forgot_password(email: str, db: Session = Depends(get_db)):
 
 
 @router.post("/password/reset")
-def reset_password(token: str, new_password: str, db: Session = Depends(get_db)):
+async def reset_password(token: str, new_password: str, db: DbSession = Depends(get_session)):
     # Valida token
     try:
         from ...core.config import settings
@@ -135,10 +164,12 @@ def reset_password(token: str, new_password: str, db: Session = Depends(get_db))
     if payload.get("purpose") != "reset" or "sub" not in payload:
         raise HTTPException(status_code=400, detail="Token inválido")
     email = payload["sub"]
-    user = db.query(User).filter(User.email == email).first()
+    user = await run_db(db, _find_user, email)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    user.hashed_password = hash_password(new_password)
-    db.add(user)
-    db.commit()
+    try:
+        hashed = await hash_password_async(new_password)
+    except PasswordHashOverloaded:
+        raise _hash_overloaded()
+    await run_db(db, _set_password, user.id, hashed)
     return {"message": "Senha redefinida com sucesso"}
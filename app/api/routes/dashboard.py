@@ -1,91 +1,93 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from prometheus_client import Histogram
 from sqlalchemy import func
-from ...models.machine import ProductionEvent, StopReason
 from ...models.product import Product
-from ..deps import get_db
+from ...models.rollup import STOP_REASON_COLUMNS
+from ...services.rollups import bucket_totals, open_event_seconds, day_floor
+from ...core.config import settings
+from ...db.async_session import run_db
+from ...services import generations
+from ...services.http_cache import etag_matches
+from ...services.response_cache import ResponseCache
+from ..deps import DbSession, get_read_session
 from ..deps import require_roles
 from ...models.user import UserRole
 
 router = APIRouter()
+_ts_hist = Histogram("vd_timeseries_seconds", "Tempo de geração das séries de tempo", ["endpoint"])
+# Respostas compartilhadas entre usuários: os dados do dashboard não dependem de quem pede
+dashboard_cache = ResponseCache("dashboard", settings.DASHBOARD_CACHE_TTL_SECONDS, settings.DASHBOARD_CACHE_MAX_ENTRIES)
+
+
+async def _cached(request: Request, db: DbSession, key: tuple, entities: tuple, fn, *args) -> Response:
+    """Resposta do cache (chave + gerações das entidades lidas), com ETag e 304."""
+    current = await run_db(db, generations.current_many, *entities)
+    cached = await dashboard_cache.get_or_compute((*key, current), lambda: run_db(db, fn, *args))
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.get("/metrics", dependencies=[Depends(require_roles(UserRole.admin, UserRole.gerente))])
-def metrics(db: Session = Depends(get_db)):
+async def metrics(request: Request, db: DbSession = Depends(get_read_session)):
+    return await _cached(request, db, ("metrics",), (generations.PRODUCTS, generations.PRODUCTION), _metrics)
+
+
+def _metrics(db: Session) -> dict:
     now = datetime.utcnow()
     window_start = now - timedelta(days=7)
 
     total_stock = db.query(func.sum(Product.quantity)).scalar() or 0
 
-    total_operating_time = db.query(
-        func.sum(func.julianday(func.coalesce(ProductionEvent.ended_at, now)) - func.julianday(ProductionEvent.started_at))
-    ).filter(ProductionEvent.status == "operating", ProductionEvent.started_at >= window_start).scalar() or 0
-
-    total_stopped_time = db.query(
-        func.sum(func.julianday(func.coalesce(ProductionEvent.ended_at, now)) - func.julianday(ProductionEvent.started_at))
-    ).filter(ProductionEvent.status == "stopped", ProductionEvent.started_at >= window_start).scalar() or 0
+    totals: dict = defaultdict(int)
+    for _, values in bucket_totals(db, window_start):
+        for column, value in values.items():
+            totals[column] += value
+    open_seconds = open_event_seconds(db, window_start, now)
+    operating_seconds = totals["operating_seconds"] + open_seconds.get("operating", 0)
+    stopped_seconds = totals["stopped_seconds"] + open_seconds.get("stopped", 0)
 
-    produced_qty = db.query(func.sum(ProductionEvent.quantity)).filter(
-        ProductionEvent.started_at >= window_start
-    ).scalar() or 0
-
-    reasons = (
-        db.query(ProductionEvent.stop_reason, func.count(ProductionEvent.id))
-        .filter(ProductionEvent.status == "stopped", ProductionEvent.started_at >= window_start)
-        .group_by(ProductionEvent.stop_reason)
-        .all()
-    )
-    reasons_dict = {str(reason or "none"): count for reason, count in reasons}
+    reasons_dict = {str(reason): int(totals[column]) for reason, column in STOP_REASON_COLUMNS.items() if totals[column]}
+    unexplained = int(totals["stop_count"]) - sum(reasons_dict.values())
+    if unexplained:
+        reasons_dict["none"] = unexplained
 
     return {
         "total_stock": total_stock,
-        "total_operating_time_days": total_operating_time,
-        "total_stopped_time_days": total_stopped_time,
-        "produced_qty": produced_qty,
+        "total_operating_time_days": operating_seconds / 86400,
+        "total_stopped_time_days": stopped_seconds / 86400,
+        "produced_qty": int(totals["produced_qty"]),
         "stop_reasons": reasons_dict,
     }
 
 
 @router.get("/timeseries", dependencies=[Depends(require_roles(UserRole.admin, UserRole.gerente, UserRole.operador))])
-_ts_hist = Histogram("vd_timeseries_seconds", "Tempo de geração das séries de tempo", ["endpoint"])
-
-def timeseries(
-    db: Session = Depends(get_db),
+async def timeseries(
+    request: Request,
+    db: DbSession = Depends(get_read_session),
     days: int = Query(default=14, ge=1, le=90),
 ):
+    return await _cached(request, db, ("timeseries", days), (generations.PRODUCTION,), _timeseries, days)
+
+
+def _timeseries(db: Session, days: int) -> dict:
     now = datetime.utcnow()
     start = now - timedelta(days=days)
-    # Produção por dia
-    with _ts_hist.labels(endpoint="produced").time():
-        rows = (
-        db.query(
-            func.date(ProductionEvent.started_at),
-            func.sum(ProductionEvent.quantity),
-        )
-        .filter(ProductionEvent.started_at >= start)
-        .group_by(func.date(ProductionEvent.started_at))
-        .order_by(func.date(ProductionEvent.started_at))
-        .all()
-        )
-    labels = [r[0] for r in rows]
-    values = [int(r[1] or 0) for r in rows]
-    # Paradas por dia
-    with _ts_hist.labels(endpoint="stops").time():
-        stop_rows = (
-        db.query(
-            func.date(ProductionEvent.started_at),
-            func.count(ProductionEvent.id),
-        )
-        .filter(ProductionEvent.started_at >= start, ProductionEvent.status == "stopped")
-        .group_by(func.date(ProductionEvent.started_at))
-        .order_by(func.date(ProductionEvent.started_at))
-        .all()
-        )
-    stop_labels = [r[0] for r in stop_rows]
-    stop_values = [int(r[1] or 0) for r in stop_rows]
+    # Produção e paradas por dia a partir dos rollups
+    with _ts_hist.labels(endpoint="rollups").time():
+        per_day: dict = defaultdict(lambda: defaultdict(int))
+        for bucket_start, values in bucket_totals(db, start):
+            day = per_day[day_floor(bucket_start).date().isoformat()]
+            for column in ("event_count", "produced_qty", "stop_count"):
+                day[column] += values[column]
+    days_sorted = sorted(per_day.items())
+    produced = [(label, d) for label, d in days_sorted if d["event_count"]]
+    stops = [(label, d) for label, d in days_sorted if d["stop_count"]]
     return {
-        "produced": {"labels": labels, "values": values},
-        "stops": {"labels": stop_labels, "values": stop_values},
+        "produced": {"labels": [label for label, _ in produced], "values": [int(d["produced_qty"]) for _, d in produced]},
+        "stops": {"labels": [label for label, _ in stops], "values": [int(d["stop_count"]) for _, d in stops]},
     }
@@ -1,100 +1,52 @@
-from io import StringIO, BytesIO
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-import pandas as pd
-from ...models.product import Product
-from ...models.machine import ProductionEvent
-from ..deps import get_db
+import os
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from ...services.exports import (
+    MEDIA_TYPES,
+    PRODUCT_COLUMNS,
+    PRODUCTION_COLUMNS,
+    iter_csv,
+    iter_rows,
+    product_rows,
+    production_rows,
+    write_xlsx,
+)
 
 router = APIRouter()
+XLSX_MEDIA_TYPE = MEDIA_TYPES["xlsx"]
 
 
 @router.get("/products/csv")
-def export_products_csv(db: Session = Depends(get_db)):
-    rows = db.query(Product).all()
-    data = [
-        {
-            "id": r.id,
-            "code": r.code,
-            "name": r.name,
-            "description": r.description,
-            "quantity": r.quantity,
-            "unit": r.unit,
-            "location": r.location,
-        }
-        for r in rows
-    ]
-    df = pd.DataFrame(data)
-    csv_buf = StringIO()
-    df.to_csv(csv_buf, index=False)
-    csv_buf.seek(0)
-    return StreamingResponse(csv_buf, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=products.csv"})
+def export_products_csv():
+    rows = iter_rows(product_rows)
+    return StreamingResponse(iter_csv(PRODUCT_COLUMNS, rows), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=products.csv"})
 
 
 @router.get("/products/xlsx")
-def export_products_xlsx(db: Session = Depends(get_db)):
-    rows = db.query(Product).all()
-    data = [
-        {
-            "id": r.id,
-            "code": r.code,
-            "name": r.name,
-            "description": r.description,
-            "quantity": r.quantity,
-            "unit": r.unit,
-            "location": r.location,
-        }
-        for r in rows
-    ]
-    df = pd.DataFrame(data)
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="products", index=False)
-    out.seek(0)
-    return StreamingResponse(out, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=products.xlsx"})
+def export_products_xlsx():
+    path = write_xlsx("products", PRODUCT_COLUMNS, iter_rows(product_rows))
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename="products.xlsx", background=BackgroundTask(os.unlink, path))
 
 
 @router.get("/production/csv")
-def export_production_csv(db: Session = Depends(get_db)):
-    rows = db.query(ProductionEvent).all()
-    data = [
-        {
-            "id": r.id,
-            "machine_id": r.machine_id,
-            "started_at": r.started_at,
-            "ended_at": r.ended_at,
-            "status": r.status,
-            "stop_reason": str(r.stop_reason) if r.stop_reason else None,
-            "quantity": r.quantity,
-        }
-        for r in rows
-    ]
-    df = pd.DataFrame(data)
-    csv_buf = StringIO()
-    df.to_csv(csv_buf, index=False)
-    csv_buf.seek(0)
-    return StreamingResponse(csv_buf, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=production.csv"})
+def export_production_csv(
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
+    machine_id: Optional[int] = Query(default=None),
+):
+    rows = iter_rows(production_rows, start=start, end=end, machine_id=machine_id)
+    return StreamingResponse(iter_csv(PRODUCTION_COLUMNS, rows), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=production.csv"})
 
 
 @router.get("/production/xlsx")
-def export_production_xlsx(db: Session = Depends(get_db)):
-    rows = db.query(ProductionEvent).all()
-    data = [
-        {
-            "id": r.id,
-            "machine_id": r.machine_id,
-            "started_at": r.started_at,
-            "ended_at": r.ended_at,
-            "status": r.status,
-            "stop_reason": str(r.stop_reason) if r.stop_reason else None,
-            "quantity": r.quantity,
-        }
-        for r in rows
-    ]
-    df = pd.DataFrame(data)
-    out = BytesIO()
-    with pd.ExcelWriter(out, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="production", index=False)
-    out.seek(0)
-    return StreamingResponse(out, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=production.xlsx"})
+def export_production_xlsx(
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
+    machine_id: Optional[int] = Query(default=None),
+):
+    rows = iter_rows(production_rows, start=start, end=end, machine_id=machine_id)
+    path = write_xlsx("production", PRODUCTION_COLUMNS, rows)
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename="production.xlsx", background=BackgroundTask(os.unlink, path))
@@ -0,0 +1,81 @@
+import os
+import re
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session
+from ...schemas.export import ExportJobCreate, ExportJobOut
+from ...services.export_jobs import export_jobs
+from ...services.exports import MEDIA_TYPES
+from ..deps import get_read_db
+
+router = APIRouter()
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _range_response(request: Request, path: str, media_type: str, filename: str, etag: str) -> Response:
+    """Serve o arquivo com suporte a Range de intervalo único (downloads retomáveis)."""
+    size = os.path.getsize(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    }
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    match = _RANGE_RE.fullmatch(range_header.strip()) if range_header else None
+    # Sem Range válido (ou If-Range divergente): arquivo completo
+    if match is None or match.groups() == ("", "") or (if_range and if_range != etag):
+        return FileResponse(path, media_type=media_type, headers=headers)
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers={"Content-Range": f"bytes */{size}"})
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(_iter_file(path, start, length), status_code=status.HTTP_206_PARTIAL_CONTENT, media_type=media_type, headers=headers)
+
+
+@router.post("/", response_model=ExportJobOut, status_code=status.HTTP_202_ACCEPTED)
+def submit_export_job(job_in: ExportJobCreate, db: Session = Depends(get_read_db)):
+    filters = job_in.model_dump(include={"start", "end", "machine_id"})
+    job = export_jobs.submit(db, job_in.entity, job_in.format, filters)
+    return job.as_dict()
+
+
+@router.get("/{job_id}", response_model=ExportJobOut)
+def export_job_status(job_id: str):
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job.as_dict()
+
+
+@router.get("/{job_id}/download")
+def export_job_download(job_id: str, request: Request):
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Exportação ainda não concluída")
+    if not os.path.exists(job.path):
+        raise HTTPException(status_code=410, detail="Arquivo expirado; envie a exportação novamente")
+    filename = f"{job.entity}.{job.format}"
+    return _range_response(request, job.path, MEDIA_TYPES[job.format], filename, f'"{job.key}"')
@@ -1,25 +1,27 @@
-from io import BytesIO
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from typing import List, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from PIL import Image
-import barcode
-from barcode.writer import ImageWriter
+from prometheus_client import Counter, Gauge, Histogram
+from ...core.config import settings
 from ...models.product import Product
 from ..deps import get_db
+from ...services import generations
+from ...services.labels import code128_modules, iter_zip, label_png, render_batch
+from ...services.http_cache import etag_matches
+from ...services.label_pdf import SheetLayout, iter_label_pdf
+from ...services.webhooks import notify_low_stock
 
 router = APIRouter()
+_batch_labels = Counter("vd_label_batch_labels_total", "Etiquetas geradas em lote", ["source"])  # cache|render
+_batch_pending = Gauge("vd_label_batch_pending", "Etiquetas de lotes em andamento ainda não enviadas")
+_batch_seconds = Histogram("vd_label_batch_seconds", "Tempo de geração e envio de lotes de etiquetas")
 
 
-def _generate_barcode_image(code: str) -> Image.Image:
+def _label_or_400(code: str, name: str) -> tuple[bytes, str]:
     try:
-        code128 = barcode.get("code128", code, writer=ImageWriter())
-        buf = BytesIO()
-        code128.write(buf, options={"module_height": 15.0, "text_distance": 1.0})
-        buf.seek(0)
-        return Image.open(buf).convert("RGB")
-    except Exception as exc:  # noqa: BLE001
+        return label_png(code, name)
+    except ValueError as exc:
         raise HTTPException(status_code=400, detail=f"Erro ao gerar código de barras: {exc}")
 
 
@@ -27,34 +29,58 @@ def _generate_barcode_image(code: str) -> Image.Image:
 
 def product_label_png(
     product_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db),  # sessão de escrita: GET pode decrementar o estoque
     decrement_qty: int = Query(default=0, ge=0, description="Quantidade a decrementar após impressão"),
 ):
     product = db.query(Product).get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
-    img = _generate_barcode_image(product.code)
-    # Compor etiqueta simples (nome + código)
-    canvas = Image.new("RGB", (max(300, img.width + 20), img.height + 60), "white")
-    canvas.paste(img, (10, 40))
-    # Deixar simples para MVP; texto básico usando PIL default (sem fonte TTF)
-    from PIL import ImageDraw
-
-    draw = ImageDraw.Draw(canvas)
-    draw.text((10, 5), f"{product.name}", fill="black")
-    draw.text((10, img.height + 40), f"{product.code}", fill="black")
+    data, key = _label_or_400(product.code, product.name)
 
     if decrement_qty > 0:
         if product.quantity < decrement_qty:
             raise HTTPException(status_code=400, detail="Quantidade insuficiente para decrementar")
         product.quantity -= decrement_qty
         db.add(product)
+        generations.bump(db, generations.PRODUCTS)
         db.commit()
+        notify_low_stock(product.code, product.name, product.quantity + decrement_qty, product.quantity)
+
+    # no-cache: o cliente revalida sempre (impressão pode decrementar estoque), mas pula o download com 304
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="image/png", headers=headers)
+
 
-    out = BytesIO()
-    canvas.save(out, format="PNG")
-    out.seek(0)
-    return StreamingResponse(out, media_type="image/png")
+def _prepare_batch(ids: List[int], db: Session, decrement: bool, qty: int) -> list[tuple[str, str]]:
+    """Valida o lote e aplica o decremento; retorna (código, nome) dos produtos.
+
+    Tudo acontece antes do envio: depois que a resposta começa a sair não há como responder 400.
+    """
+    if len(ids) > settings.LABEL_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Lote excede o limite de {settings.LABEL_BATCH_MAX_ITEMS} etiquetas")
+    products = db.query(Product).filter(Product.id.in_(ids)).all()
+    if not products:
+        raise HTTPException(status_code=404, detail="Nenhum produto encontrado")
+    for p in products:
+        try:
+            code128_modules(p.code)
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=400, detail=f"Erro ao gerar código de barras: {exc}")
+        if decrement:
+            if p.quantity < qty:
+                raise HTTPException(status_code=400, detail=f"Quantidade insuficiente para {p.code}")
+            p.quantity -= qty
+            db.add(p)
+    if decrement:
+        generations.bump(db, generations.PRODUCTS)
+        db.commit()
+        for p in products:
+            notify_low_stock(p.code, p.name, p.quantity + qty, p.quantity)
+    return [(p.code, p.name) for p in products]
 
 
 @router.post("/batch/png")
@@ -65,34 +91,45 @@ def batch_labels_png(
     decrement: bool = Query(default=False, description="Se true, decrementa 1 por produto impresso"),
     qty: int = Query(default=1, ge=1, description="Quantidade de etiquetas por produto; usada para decremento"),
 ):
-    products = db.query(Product).filter(Product.id.in_(ids)).all()
-    if not products:
-        raise HTTPException(status_code=404, detail="Nenhum produto encontrado")
-    # Gera um zip em memória de PNGs
-    import zipfile
+    items = _prepare_batch(ids, db, decrement, qty)
+    return StreamingResponse(_stream_batch(items), media_type="application/zip", headers={"Content-Disposition": "attachment; filename=labels.zip"})
 
-    mem = BytesIO()
-    with zipfile.ZipFile(mem, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for p in products:
-            img = _generate_barcode_image(p.code)
-            canvas = Image.new("RGB", (max(300, img.width + 20), img.height + 60), "white")
-            canvas.paste(img, (10, 40))
-            from PIL import ImageDraw
-
-            draw = ImageDraw.Draw(canvas)
-            draw.text((10, 5), f"{p.name}", fill="black")
-            draw.text((10, img.height + 40), f"{p.code}", fill="black")
-
-            buf = BytesIO()
-            canvas.save(buf, format="PNG")
-            buf.seek(0)
-            zf.writestr(f"label_{p.code}.png", buf.read())
-            if decrement:
-                if p.quantity < qty:
-                    raise HTTPException(status_code=400, detail=f"Quantidade insuficiente para {p.code}")
-                p.quantity -= qty
-                db.add(p)
-    if decrement:
-        db.commit()
-    mem.seek(0)
-    return StreamingResponse(mem, media_type="application/zip", headers={"Content-Disposition": "attachment; filename=labels.zip"})
+
+@router.post("/batch/pdf")
+
+def batch_labels_pdf(
+    ids: List[int],
+    db: Session = Depends(get_db),
+    decrement: bool = Query(default=False, description="Se true, decrementa qty por produto impresso"),
+    qty: int = Query(default=1, ge=1, description="Cópias da etiqueta por produto; usada para decremento"),
+    layout: Literal["a4", "roll"] = Query(default="a4", description="a4: grade em folha A4; roll: bobina térmica (uma etiqueta por página)"),
+    columns: int = Query(default=3, ge=1, le=10, description="Colunas da grade A4"),
+    rows: int = Query(default=8, ge=1, le=30, description="Linhas da grade A4"),
+    width_mm: float = Query(default=100.0, gt=10, le=300, description="Largura da etiqueta na bobina"),
+    height_mm: float = Query(default=50.0, gt=10, le=300, description="Altura da etiqueta na bobina"),
+):
+    if len(ids) * qty > settings.LABEL_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Lote excede o limite de {settings.LABEL_BATCH_MAX_ITEMS} etiquetas")
+    items = _prepare_batch(ids, db, decrement, qty)
+    sheet = SheetLayout.grid(columns, rows) if layout == "a4" else SheetLayout.roll(width_mm, height_mm)
+    return StreamingResponse(iter_label_pdf(items, qty, sheet), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=labels.pdf"})
+
+
+def _stream_batch(items: list[tuple[str, str]]):
+    pending = len(items)
+    _batch_pending.inc(pending)
+
+    def _entries():
+        nonlocal pending
+        for code, data, cached in render_batch(items):
+            _batch_labels.labels(source="cache" if cached else "render").inc()
+            _batch_pending.dec()
+            pending -= 1
+            yield f"label_{code}.png", data
+
+    try:
+        with _batch_seconds.time():
+            yield from iter_zip(_entries())
+    finally:
+        # Cliente desconectado no meio do lote: descarta o restante pendente
+        _batch_pending.dec(pending)
@@ -1,14 +1,29 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 from ...schemas.machine import MachineCreate, MachineOut, ProductionEventCreate, ProductionEventOut
 from ...models.machine import Machine, ProductionEvent, StopReason
-from ..deps import get_db, require_roles
+from ..deps import DbSession, get_db, get_read_db, get_read_session, get_session, require_roles
+from ...services.machine_status import status_board
+from ...services.machine_stream import StatusStreamResponse, broadcaster
+from ...db.session import ReadSessionLocal
+from ...services import rollups, generations
+from ...core.config import settings
+from ...db.async_session import run_db
+from ...services.event_buffer import event_buffer
+from ...services.event_ingest import ingest, machine_directory, parse_records
+from ...services.pagination import decode_cursor, page, parse_datetime
+from ...services.fast_json import json_response, rows_response, schema_columns
+from ...services.webhooks import webhooks
 from ...models.user import UserRole
 
 router = APIRouter()
+# Listagens: colunas dos schemas de saída lidas como tuplas e serializadas com orjson
+_MACHINE_COLUMNS = schema_columns(Machine, MachineOut)
+_EVENT_COLUMNS = schema_columns(ProductionEvent, ProductionEventOut)
 
 
 @router.post("/", response_model=MachineOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.gerente))])
@@ -20,62 +35,105 @@ def create_machine(machine_in: MachineCreate, db: Session = Depends(get_db)):
     db.add(machine)
     db.commit()
     db.refresh(machine)
+    status_board.machine_added(machine)
+    machine_directory.add(machine)
     return machine
 
 
 @router.get("/", response_model=List[MachineOut])
-def list_machines(db: Session = Depends(get_db)):
-    return db.query(Machine).order_by(Machine.name.asc()).all()
+def list_machines(db: Session = Depends(get_read_db)):
+    return rows_response(db.query(*_MACHINE_COLUMNS).order_by(Machine.name.asc()).all())
 
 
 @router.get("/status")
-def machines_status(db: Session = Depends(get_db)):
-    machines = db.query(Machine).order_by(Machine.name.asc()).all()
-    result = []
-    for m in machines:
-        last_event = (
-            db.query(ProductionEvent)
-            .filter(ProductionEvent.machine_id == m.id)
-            .order_by(desc(ProductionEvent.started_at))
-            .first()
-        )
-        result.append(
-            {
-                "id": m.id,
-                "name": m.name,
-                "location": m.location,
-                "status": last_event.status if last_event else "unknown",
-                "stop_reason": str(last_event.stop_reason) if last_event and last_event.stop_reason else None,
-                "last_started_at": last_event.started_at.isoformat() if last_event else None,
-                "last_ended_at": last_event.ended_at.isoformat() if last_event and last_event.ended_at else None,
-                "last_quantity": last_event.quantity if last_event else 0,
-            }
-        )
-    return result
+async def machines_status(db: DbSession = Depends(get_read_session)):
+    return json_response(await run_db(db, status_board.snapshot))
 
 
-@router.post("/events", response_model=ProductionEventOut)
-def add_event(event_in: ProductionEventCreate, db: Session = Depends(get_db)):
+def _snapshot() -> list[dict]:
+    # Sessão própria: a da dependência já está fechada quando o stream começa
+    with ReadSessionLocal() as db:
+        return status_board.snapshot(db)
+
+
+@router.get("/stream")
+async def machines_stream():
+    """Status ao vivo (Server-Sent Events): evento `snapshot` com todas as máquinas, depois `status` por mudança."""
+    queue = broadcaster.subscribe()
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Limite de conexões atingido", headers={"Retry-After": "5"})
+    return StatusStreamResponse(
+        broadcaster, queue, _snapshot, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _enqueue(db: Session, event_in: ProductionEventCreate) -> JSONResponse:
+    """Modo buffer: valida a máquina pelo cache e confirma com 202 ao enfileirar."""
+    if not machine_directory.resolve(db, [event_in.machine_id]):
+        raise HTTPException(status_code=404, detail="Máquina não encontrada")
+    if not event_buffer.offer(event_in):
+        raise HTTPException(status_code=429, detail="Fila de eventos cheia", headers={"Retry-After": "1"})
+    return JSONResponse(status_code=202, content={"ok": True, "queued": True})
+
+
+def _record_event(db: Session, event_in: ProductionEventCreate):
+    if event_buffer.enabled:
+        return _enqueue(db, event_in)
     machine = db.query(Machine).get(event_in.machine_id)
     if not machine:
         raise HTTPException(status_code=404, detail="Máquina não encontrada")
     event = ProductionEvent(**event_in.model_dump())
     db.add(event)
+    rollups.record_event(db, event)
+    generations.bump(db, generations.PRODUCTION)
     db.commit()
     db.refresh(event)
+    status_board.event_recorded(machine, event)
     return event
 
 
+@router.post("/events", response_model=ProductionEventOut)
+async def add_event(event_in: ProductionEventCreate, db: DbSession = Depends(get_session)):
+    return await run_db(db, _record_event, event_in)
+
+
+@router.post("/events/batch")
+async def add_events_batch(
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, max_length=128),
+    db: DbSession = Depends(get_session),
+):
+    """Lote de eventos (array JSON ou NDJSON com Content-Type application/x-ndjson).
+
+    Responde com aceitos/rejeitados e os erros por índice; repetir a mesma
+    Idempotency-Key devolve o resultado original sem gravar de novo.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    body = await request.body()
+    try:
+        records = parse_records(body, ndjson)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Corpo inválido: {exc}")
+    if len(records) > settings.INGEST_MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {settings.INGEST_MAX_BATCH_ITEMS} eventos por lote")
+    return await run_db(db, ingest, records, idempotency_key)
+
+
 @router.post("/{machine_id}/stop")
 def register_stop(
     machine_id: int,
     reason: StopReason,
     db: Session = Depends(get_db),
 ):
+    now = datetime.utcnow()
+    if event_buffer.enabled:
+        stop = ProductionEventCreate(machine_id=machine_id, started_at=now, status="stopped", stop_reason=reason, quantity=0)
+        response = _enqueue(db, stop)
+        webhooks.enqueue("machine_stopped", machine_id=machine_id, reason=reason.value, started_at=now.isoformat())
+        return response
     machine = db.query(Machine).get(machine_id)
     if not machine:
         raise HTTPException(status_code=404, detail="Máquina não encontrada")
-    now = datetime.utcnow()
     event = ProductionEvent(
         machine_id=machine_id,
         started_at=now,
@@ -85,20 +143,36 @@ def register_stop(
         quantity=0,
     )
     db.add(event)
+    rollups.record_event(db, event)
+    generations.bump(db, generations.PRODUCTION)
     db.commit()
+    status_board.event_recorded(machine, event)
+    webhooks.enqueue("machine_stopped", machine_id=machine_id, machine=machine.name, reason=reason.value, started_at=now.isoformat())
     return {"ok": True}
 
 
 @router.get("/{machine_id}/history", response_model=List[ProductionEventOut])
 def history(
     machine_id: int,
+    response: Response,
     start: Optional[datetime] = Query(default=None),
     end: Optional[datetime] = Query(default=None),
-    db: Session = Depends(get_db),
+    limit: int = Query(default=500, ge=1, le=5000),
+    cursor: Optional[str] = Query(default=None),
+    db: Session = Depends(get_read_db),
 ):
-    q = db.query(ProductionEvent).filter(ProductionEvent.machine_id == machine_id)
+    q = db.query(*_EVENT_COLUMNS).filter(ProductionEvent.machine_id == machine_id)
     if start:
         q = q.filter(ProductionEvent.started_at >= start)
     if end:
         q = q.filter((ProductionEvent.ended_at == None) | (ProductionEvent.ended_at <= end))  # noqa: E711
-    return q.order_by(ProductionEvent.started_at.desc()).all()
+    # Mais recentes primeiro, em páginas por (started_at, id); próxima página em X-Next-Cursor
+    if cursor:
+        try:
+            started_at, last_id = decode_cursor(cursor, 2)
+            started_at = parse_datetime(started_at)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        q = q.filter(tuple_(ProductionEvent.started_at, ProductionEvent.id) < tuple_(started_at, last_id))
+    rows = q.order_by(ProductionEvent.started_at.desc(), ProductionEvent.id.desc()).limit(limit + 1).all()
+    return rows_response(page(rows, limit, response, lambda e: (e.started_at, e.id)), response)
@@ -1,12 +1,22 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from ...schemas.product import ProductCreate, ProductOut, ProductUpdate
 from ...models.product import Product
-from ..deps import get_db, require_roles
+from ..deps import DbSession, get_db, get_read_db, get_read_session, require_roles
+from ...db.async_session import run_db
+from ...services import generations
+from ...services.labels import label_cache
+from ...services.webhooks import notify_low_stock
+from ...services.product_search import search_ids
+from ...services.pagination import decode_cursor, page
+from ...services.fast_json import rows_response, schema_columns
 from ...models.user import UserRole
 
 router = APIRouter()
+# Listagem: colunas do ProductOut lidas como tuplas e serializadas com orjson
+_LIST_COLUMNS = schema_columns(Product, ProductOut)
 
 
 @router.post("/", response_model=ProductOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.gerente))])
@@ -16,28 +26,46 @@ def create_product(product_in: ProductCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Código já existe")
     product = Product(**product_in.model_dump())
     db.add(product)
+    generations.bump(db, generations.PRODUCTS)
     db.commit()
     db.refresh(product)
     return product
 
 
 @router.get("/", response_model=List[ProductOut])
-def list_products(
-    db: Session = Depends(get_db),
+async def list_products(
+    response: Response,
+    db: DbSession = Depends(get_read_session),
     q: Optional[str] = Query(default=None),
     skip: int = 0,
     limit: int = Query(default=20, le=100),
+    cursor: Optional[str] = Query(default=None),
 ):
-    query = db.query(Product)
+    return rows_response(await run_db(db, _list_products, response, q, skip, limit, cursor), response)
+
+
+def _list_products(db: Session, response: Response, q: Optional[str], skip: int, limit: int, cursor: Optional[str]):
     if q:
-        like = f"%{q}%"
-        query = query.filter((Product.name.ilike(like)) | (Product.code.ilike(like)))
-    items = query.order_by(Product.name.asc()).offset(skip).limit(limit).all()
-    return items
+        # Busca ranqueada (código exato/prefixo, FTS trigram, tolerância a erros)
+        ids = search_ids(db, q, limit=limit, skip=skip)
+        by_id = {p.id: p for p in db.query(*_LIST_COLUMNS).filter(Product.id.in_(ids))}
+        return [by_id[pid] for pid in ids if pid in by_id]
+    # Paginação por chave (name, id): o cursor de X-Next-Cursor continua do último item
+    query = db.query(*_LIST_COLUMNS).order_by(Product.name.asc(), Product.id.asc())
+    if cursor:
+        try:
+            name, last_id = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        query = query.filter(tuple_(Product.name, Product.id) > tuple_(name, last_id))
+    elif skip:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    return page(rows, limit, response, lambda p: (p.name, p.id))
 
 
 @router.get("/{product_id}", response_model=ProductOut)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+def get_product(product_id: int, db: Session = Depends(get_read_db)):
     product = db.query(Product).get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -49,11 +77,18 @@ def update_product(product_id: int, product_in: ProductUpdate, db: Session = Dep
     product = db.query(Product).get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
-    for field, value in product_in.model_dump(exclude_unset=True).items():
+    changes = product_in.model_dump(exclude_unset=True)
+    previous_qty = product.quantity
+    name_changed = "name" in changes and changes["name"] != product.name
+    for field, value in changes.items():
         setattr(product, field, value)
     db.add(product)
+    generations.bump(db, generations.PRODUCTS)
     db.commit()
     db.refresh(product)
+    if name_changed:
+        label_cache.invalidate_code(product.code)
+    notify_low_stock(product.code, product.name, previous_qty, product.quantity)
     return product
 
 
@@ -63,7 +98,9 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     if not product:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     db.delete(product)
+    generations.bump(db, generations.PRODUCTS)
     db.commit()
+    label_cache.invalidate_code(product.code)
     return {"ok": True}
 
 
@@ -76,5 +113,7 @@ def decrement_after_label(product_id: int, qty: int = 1, db: Session = Depends(g
         raise HTTPException(status_code=400, detail="Quantidade insuficiente em estoque")
     product.quantity -= qty
     db.add(product)
+    generations.bump(db, generations.PRODUCTS)
     db.commit()
+    notify_low_stock(product.code, product.name, product.quantity + qty, product.quantity)
     return {"id": product.id, "quantity": product.quantity}
@@ -0,0 +1,139 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..services.http_cache import brotli, negotiate
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        # wbits 31 = cabeçalho e rodapé gzip
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int) -> None:
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class CompressionMiddleware:
+    """gzip/brotli conforme Accept-Encoding, inclusive para StreamingResponse.
+
+    Não comprime: respostas abaixo de `minimum_size` (pelo Content-Length ou
+    pelo corpo inteiro), tipos em `excluded_types` (prefixos, ex.: image/,
+    application/zip, text/event-stream), respostas que já têm Content-Encoding (páginas e
+    estáticos pré-comprimidos) e downloads com Range/Accept-Ranges, cujos
+    offsets valem para os bytes sem compressão.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        excluded_types: tuple[str, ...] = (),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_types = excluded_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), ("br", "gzip"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self, encoding, send).run(scope, receive)
+
+    def compressible(self, status: int, headers: Headers) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers or "content-range" in headers or "accept-ranges" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not any(content_type.startswith(prefix) for prefix in self.excluded_types)
+
+    def stream(self, encoding: str):
+        return _BrotliStream(self.brotli_quality) if encoding == "br" else _GzipStream(self.gzip_level)
+
+
+class _Responder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+        self.buffer = b""
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.middleware.app(scope, receive, self.wrapped_send)
+
+    async def wrapped_send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            length = headers.get("content-length")
+            self.passthrough = not self.middleware.compressible(message["status"], headers) or (
+                length is not None and length.isdigit() and int(length) < self.middleware.minimum_size
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            # Middlewares anteriores podem repassar o corpo em partes: acumula até decidir pelo tamanho
+            self.buffer += body
+            if more_body and len(self.buffer) < self.middleware.minimum_size:
+                return
+            body, self.buffer = self.buffer, b""
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Corpo pequeno: compressão não compensa
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            self.compressor = self.middleware.stream(self.encoding)
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # Bytes diferentes da representação original: ETag passa a ser fraca
+                headers["ETag"] = f"W/{etag}"
+            if not more_body:
+                data = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(data))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            del headers["Content-Length"]
+            await self.send(self.start)
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
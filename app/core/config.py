@@ -7,6 +7,23 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 120
     ALGORITHM: str = "HS256"
     DATABASE_URL: str = "sqlite:///./vectradex.db"
+    # Pool de conexões (QueuePool); pre-ping só para bancos em rede
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    # Sessões de leitura: réplica opcional (Postgres) e pool próprio; no SQLite usa o mesmo arquivo com query_only
+    READ_DATABASE_URL: str | None = None
+    DB_READ_POOL_SIZE: int = 10
+    DB_READ_MAX_OVERFLOW: int = 20
+    # Rotas mais acessadas com AsyncSession (aiosqlite/asyncpg) em vez de sessão síncrona no threadpool
+    DB_ASYNC: bool = False
+    # Perfil de desempenho do SQLite: PRAGMAs aplicados em cada conexão (false = padrões do SQLite)
+    SQLITE_PERFORMANCE_PROFILE: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB
+    SQLITE_CACHE_SIZE_KB: int = 65536  # 64MB por conexão
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
     CORS_ORIGINS: str = ""
     COOKIE_SECURE: bool = False
     HSTS_ENABLED: bool = False
@@ -17,12 +34,78 @@ class Settings(BaseSettings):
     LOG_MAX_BYTES: int = 1048576  # 1MB
     LOG_BACKUP_COUNT: int = 5
     WEBHOOK_URL: str | None = None
+    # Envio de webhooks em segundo plano: fila limitada, lotes (1 = um evento por POST), novas tentativas e spool no encerramento
+    WEBHOOK_MAX_PENDING: int = 1000
+    WEBHOOK_BATCH_SIZE: int = 1
+    WEBHOOK_BATCH_MS: int = 250
+    WEBHOOK_TIMEOUT_SECONDS: float = 5.0
+    WEBHOOK_MAX_RETRIES: int = 3
+    WEBHOOK_SPOOL_PATH: str = "data/webhook_spool.jsonl"
+    # Alerta de estoque baixo (webhook) quando a quantidade cai até este valor (-1 = desativado)
+    LOW_STOCK_THRESHOLD: int = 5
     # Rate limiting login
     LOGIN_MAX_ATTEMPTS: int = 5
     LOGIN_WINDOW_SECONDS: int = 600  # 10min
     LOGIN_LOCKOUT_SECONDS: int = 900  # 15min
+    # Contadores do rate limit: memory (por processo) ou sqlite (arquivo compartilhado entre workers)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = "data/rate_limit.db"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_SWEEP_SECONDS: int = 60
     # Segredo separado para fluxo de recuperação de senha
     PASSWORD_RESET_SECRET: str | None = None
+    # Cache do usuário autenticado (por e-mail do token); AUTH_ROLE_CLAIM leva id/papel assinados no token
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 4096
+    AUTH_ROLE_CLAIM: bool = False
+    # bcrypt: custo (hashes com outro custo são refeitos no login), threads dedicadas e fila máxima antes de 503
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    # Status de máquinas em memória (leituras sem consulta ao banco); use com um único worker
+    MACHINE_STATUS_CACHE: bool = False
+    # Status ao vivo (SSE): limite de conexões, fila por conexão, heartbeat e duração máxima antes de reconectar
+    MACHINE_STREAM_MAX_SUBSCRIBERS: int = 500
+    MACHINE_STREAM_QUEUE_SIZE: int = 256
+    MACHINE_STREAM_HEARTBEAT_SECONDS: int = 15
+    MACHINE_STREAM_MAX_SECONDS: int = 600
+    MACHINE_STREAM_RETRY_MS: int = 3000
+    # Cache das respostas do dashboard (invalidado por gerações; TTL cobre janelas relativas a agora, 0 = desativado)
+    DASHBOARD_CACHE_TTL_SECONDS: int = 30
+    DASHBOARD_CACHE_MAX_ENTRIES: int = 256
+    # Linhas por lote lidas do cursor nas exportações
+    EXPORT_BATCH_SIZE: int = 1000
+    # Jobs de exportação em segundo plano
+    EXPORT_JOB_WORKERS: int = 2
+    EXPORT_ARTIFACT_DIR: str = "data/exports"
+    EXPORT_ARTIFACT_MAX_AGE_SECONDS: int = 86400  # 24h
+    EXPORT_ARTIFACT_MAX_BYTES: int = 1073741824  # 1GB
+    # Cache de etiquetas PNG (diretório opcional para camada em disco)
+    LABEL_CACHE_MAX_ENTRIES: int = 2048
+    LABEL_CACHE_DIR: str | None = None
+    # Lotes de etiquetas: limite de itens e processos de renderização (None = nº de CPUs, 0 = sem pool)
+    LABEL_BATCH_MAX_ITEMS: int = 5000
+    LABEL_BATCH_WORKERS: int | None = None
+    # Ingestão de eventos em lote (gateways PLC/SCADA)
+    INGEST_MAX_BATCH_ITEMS: int = 5000
+    INGEST_IDEMPOTENCY_TTL_SECONDS: int = 86400  # 24h
+    INGEST_MACHINE_CACHE_SECONDS: int = 60
+    # Buffer de escrita de eventos: confirma ao enfileirar e grava em commits agrupados (novas tentativas se o commit falhar)
+    EVENT_BUFFER_ENABLED: bool = False
+    EVENT_BUFFER_MAX_ITEMS: int = 10000
+    EVENT_BUFFER_FLUSH_MS: int = 200
+    EVENT_BUFFER_FLUSH_EVENTS: int = 500
+    EVENT_BUFFER_MAX_RETRIES: int = 3
+    # Páginas da UI renderizadas na inicialização; auto reload confere os templates a cada acesso (desenvolvimento)
+    PAGES_AUTO_RELOAD: bool = False
+    # Diretório do cache de bytecode do Jinja2 (None = desativado)
+    JINJA_BYTECODE_CACHE_DIR: str | None = None
+    # Compressão gzip/brotli das respostas: tamanho mínimo, níveis e tipos excluídos (prefixos separados por vírgula)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_EXCLUDED_TYPES: str = "image/,application/zip,application/pdf,application/vnd.openxmlformats-officedocument,text/event-stream"
 
     class Config:
         env_file = ".env"
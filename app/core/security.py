@@ -1,24 +1,104 @@
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from threading import Lock
+from typing import Callable, Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
 from .config import settings
 
-_password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min = max = padrão: qualquer hash com outro custo é marcado para atualização
+_password_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+_hash_seconds = Histogram("vd_password_hash_seconds", "Duração do bcrypt", ["op"])  # hash|verify
+_hash_pending = Gauge("vd_password_hash_pending", "Operações bcrypt em execução ou na fila")
+_hash_rejected = Counter("vd_password_hash_rejected_total", "Operações bcrypt recusadas por fila cheia")
+
+
+class PasswordHashOverloaded(Exception):
+    """Fila de hashing cheia; a rota responde 503."""
 
 
 def hash_password(plain_password: str) -> str:
-    return _password_context.hash(plain_password)
+    with _hash_seconds.labels("hash").time():
+        return _password_context.hash(plain_password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return _password_context.verify(plain_password, hashed_password)
+    with _hash_seconds.labels("verify").time():
+        return _password_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verifica a senha; se o hash usar outro custo, devolve também o novo hash."""
+    with _hash_seconds.labels("verify").time():
+        return _password_context.verify_and_update(plain_password, hashed_password)
+
+
+class _HashExecutor:
+    """Threads dedicadas ao bcrypt (que libera o GIL) com limite de pendências.
+
+    Mantém o threadpool do Starlette livre para as demais rotas; acima de
+    `max_pending` a chamada falha na hora em vez de enfileirar.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = Lock()
+
+    def _done(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            _hash_pending.set(self._pending)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                _hash_rejected.inc()
+                raise PasswordHashOverloaded()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            self._pending += 1
+            _hash_pending.set(self._pending)
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_hash_executor = _HashExecutor(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+
+async def hash_password_async(plain_password: str) -> str:
+    return await asyncio.wrap_future(_hash_executor.submit(hash_password, plain_password))
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await asyncio.wrap_future(_hash_executor.submit(verify_and_update_password, plain_password, hashed_password))
+
+
+def shutdown_hash_executor() -> None:
+    _hash_executor.shutdown()
 
 
-def create_access_token(subject: str, expires_minutes: Optional[int] = None) -> str:
+def create_access_token(subject: str, expires_minutes: Optional[int] = None, claims: Optional[dict] = None) -> str:
     expire_delta = timedelta(minutes=expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     expire = datetime.now(tz=timezone.utc) + expire_delta
-    to_encode = {"sub": subject, "exp": expire}
+    to_encode = {**(claims or {}), "sub": subject, "exp": expire}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
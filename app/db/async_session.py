@@ -0,0 +1,75 @@
+import logging
+from typing import Callable, Optional, TypeVar, Union
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+from ..core.config import settings
+from .session import engine_options, install_pragmas, is_memory
+
+logger = logging.getLogger("db")
+
+T = TypeVar("T")
+
+# Driver assíncrono por banco (DB_ASYNC)
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"DB_ASYNC não suporta o banco {url.get_backend_name()}")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def build_async_engine(database_url: str, read_only: bool = False) -> AsyncEngine:
+    """Equivalente assíncrono de build_engine: mesmo pool, PRAGMAs e modo somente leitura."""
+    options = engine_options(database_url, read_only)
+    if "poolclass" not in options:
+        # aiosqlite usa NullPool por padrão em arquivos: mantém o pool dimensionado
+        options["poolclass"] = AsyncAdaptedQueuePool
+    new_engine = create_async_engine(async_url(database_url), **options)
+    backend = new_engine.dialect.name
+    if backend == "sqlite":
+        install_pragmas(new_engine.sync_engine, read_only)
+    elif read_only and backend == "postgresql":
+        new_engine = new_engine.execution_options(postgresql_readonly=True)
+    return new_engine
+
+
+def _async_enabled() -> bool:
+    if settings.DB_ASYNC and is_memory(make_url(settings.DATABASE_URL)):
+        # Um banco em memória por engine: o stack assíncrono não veria os dados do síncrono
+        logger.warning("db_async_disabled reason=memory_database")
+        return False
+    return settings.DB_ASYNC
+
+
+async_enabled = _async_enabled()
+async_engine: Optional[AsyncEngine] = build_async_engine(settings.DATABASE_URL) if async_enabled else None
+async_read_engine: Optional[AsyncEngine] = (
+    build_async_engine(settings.READ_DATABASE_URL or settings.DATABASE_URL, read_only=True) if async_enabled else None
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False) if async_engine else None
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, expire_on_commit=False) if async_read_engine else None
+
+
+async def run_db(db: Union[Session, AsyncSession], fn: Callable[..., T], *args, **kwargs) -> T:
+    """Executa código síncrono de serviço com a sessão da rota.
+
+    Com AsyncSession usa `run_sync` (I/O pelo driver assíncrono, sem ocupar o
+    threadpool); com Session síncrona roda no threadpool do Starlette.
+    No caminho assíncrono `fn` roda na thread do event loop: não segure
+    threading.Lock durante consultas (outra requisição no mesmo lock trava o loop).
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def dispose() -> None:
+    for target in (async_engine, async_read_engine):
+        if target is not None:
+            await target.dispose()
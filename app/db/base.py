@@ -8,6 +8,9 @@ try:
 	from ..models import user as _user_model  # noqa: F401
 	from ..models import product as _product_model  # noqa: F401
 	from ..models import machine as _machine_model  # noqa: F401
+	from ..models import rollup as _rollup_model  # noqa: F401
+	from ..models import generation as _generation_model  # noqa: F401
+	from ..models import ingest as _ingest_model  # noqa: F401
 except Exception:
 	# Durante ferramentas de análise/lint pode falhar sem dependências instaladas
 	pass
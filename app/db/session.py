@@ -1,11 +1,94 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from ..core.config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
-    pool_pre_ping=True,
-)
+
+def _sqlite_pragmas() -> dict:
+    if not settings.SQLITE_PERFORMANCE_PROFILE:
+        return {"busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS}
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,  # negativo = KiB
+        "temp_store": settings.SQLITE_TEMP_STORE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    }
+
+
+def is_memory(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def engine_options(database_url: str, read_only: bool = False) -> dict:
+    """Argumentos de create_engine (pool e connect_args) conforme o banco."""
+    url = make_url(database_url)
+    pool = {
+        "pool_size": settings.DB_READ_POOL_SIZE if read_only else settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_READ_MAX_OVERFLOW if read_only else settings.DB_MAX_OVERFLOW,
+    }
+    if url.get_backend_name() != "sqlite":
+        return {**pool, "pool_pre_ping": True}
+    if is_memory(url):
+        # Banco em memória só existe na própria conexão: compartilha uma única
+        return {"connect_args": {"check_same_thread": False}, "poolclass": StaticPool}
+    # Arquivo local: sem pre-ping (não há conexão de rede a cair)
+    return {**pool, "connect_args": {"check_same_thread": False}}
+
+
+def install_pragmas(target: Engine, read_only: bool = False) -> None:
+    """Aplica os PRAGMAs do perfil (e query_only no pool de leitura) em cada nova conexão SQLite."""
+    pragmas = _sqlite_pragmas()
+    if read_only:
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(target, "connect")
+    def _apply_pragmas(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def build_engine(database_url: str, read_only: bool = False) -> Engine:
+    """Engine com pool adequado ao banco; no SQLite aplica os PRAGMAs do perfil em cada conexão.
+
+    `read_only` cria o pool de leitura: conexões SQLite com `query_only` e
+    transações somente leitura no Postgres.
+    """
+    new_engine = create_engine(database_url, **engine_options(database_url, read_only))
+    backend = new_engine.dialect.name
+    if backend == "sqlite":
+        install_pragmas(new_engine, read_only)
+    elif read_only and backend == "postgresql":
+        new_engine = new_engine.execution_options(postgresql_readonly=True)
+    return new_engine
+
+
+def _build_read_engine() -> Engine:
+    if settings.READ_DATABASE_URL:
+        return build_engine(settings.READ_DATABASE_URL, read_only=True)
+    if is_memory(make_url(settings.DATABASE_URL)):
+        # Sem arquivo para abrir uma segunda conexão: leituras usam a mesma
+        return engine
+    return build_engine(settings.DATABASE_URL, read_only=True)
+
+
+def describe_engine(target: Engine) -> dict:
+    """Configuração efetiva (pool e PRAGMAs lidos do banco) para o log de inicialização."""
+    info = {"dialect": target.dialect.name, "pool": type(target.pool).__name__}
+    if target.dialect.name == "sqlite":
+        with target.connect() as conn:
+            for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout", "query_only"):
+                info[name] = conn.execute(text(f"PRAGMA {name}")).scalar()
+    return info
+
+
+engine = build_engine(settings.DATABASE_URL)
+read_engine = _build_read_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Leituras (GET, exportações): pool separado, para que escritas não esperem atrás de consultas longas
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
@@ -1,24 +1,52 @@
 from fastapi import FastAPI, Request
 import logging, json, sys
+from contextlib import asynccontextmanager
 from logging.handlers import RotatingFileHandler
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Counter
 from fastapi.responses import HTMLResponse
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import RedirectResponse
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from starlette.responses import RedirectResponse, Response
 from .core.config import settings
 from .api.api_v1 import api_router
-from .db.session import engine
+from .db.session import describe_engine, engine, read_engine
 from .db.base import Base
+from .core.security import shutdown_hash_executor
+from .db import async_session
+from .services.event_buffer import event_buffer
+from .services.export_jobs import export_jobs
+from .services import product_search
+from .services.labels import shutdown_pool as shutdown_label_pool
+from .services.pages import pages
+from .services.static_assets import static_assets
+from .core.compression import CompressionMiddleware
+from .services.webhooks import webhooks
 
 # Criar tabelas no startup
 Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="VectraDex API", version="1.0.0")
+# create_all não altera tabelas existentes: garante índices adicionados depois
+for _table in Base.metadata.sorted_tables:
+    for _index in _table.indexes:
+        _index.create(bind=engine, checkfirst=True)
+# Índice de busca de produtos (FTS5 trigram no SQLite)
+product_search.ensure_index(engine)
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI):
+    # Webhooks: reenvia o spool da execução anterior
+    await webhooks.start()
+    yield
+    # Encerramento: grava eventos pendentes e libera workers em segundo plano
+    event_buffer.shutdown()
+    await webhooks.stop()
+    export_jobs.shutdown()
+    shutdown_label_pool()
+    shutdown_hash_executor()
+    await async_session.dispose()
+
+app = FastAPI(title="VectraDex API", version="1.0.0", lifespan=_lifespan)
 
 # Logging configurável (JSON opcional)
 class _JsonFormatter(logging.Formatter):
@@ -56,6 +84,9 @@ def _setup_logging():
         root.addHandler(file_handler)
 
 _setup_logging()
+logging.getLogger("db").info("database_profile %s", json.dumps(describe_engine(engine), default=str))
+if read_engine is not engine:
+    logging.getLogger("db").info("database_read_profile %s", json.dumps(describe_engine(read_engine), default=str))
 
 # CORS
 origins = [o.strip() for o in settings.CORS_ORIGINS.split(",")] if settings.CORS_ORIGINS else []
@@ -65,6 +96,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Headers de segurança básicos
@@ -89,41 +121,45 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(SecurityHeadersMiddleware)
 
+# Compressão das respostas da API (por último = mais externo: comprime já com os headers finais)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        excluded_types=tuple(t.strip().lower() for t in settings.COMPRESSION_EXCLUDED_TYPES.split(",") if t.strip()),
+    )
+
 # Prometheus metrics
 Instrumentator().instrument(app).expose(app, endpoint="/metrics")
 login_fail_counter = Counter("vd_login_failures_total", "Falhas de login", ["reason"])  # invalid_credentials|rate_limited
 
 # Static e Templates (UI simples)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-_templates_env = Environment(
-    loader=FileSystemLoader("app/templates"),
-    autoescape=select_autoescape(["html", "xml"])  # noqa: WPS317
-)
+static_assets.preload()
+app.mount("/static", static_assets, name="static")
+# Páginas pré-renderizadas (HTML e versões comprimidas em memória)
+pages.preload()
 
 @app.get("/", response_class=HTMLResponse)
-async def index(_: Request) -> HTMLResponse:
-    template = _templates_env.get_template("index.html")
-    return HTMLResponse(template.render())
+async def index(request: Request) -> Response:
+    return pages.response("index.html", request)
 
 @app.get("/login", response_class=HTMLResponse)
-async def login_page(_: Request) -> HTMLResponse:
-    template = _templates_env.get_template("login.html")
-    return HTMLResponse(template.render())
+async def login_page(request: Request) -> Response:
+    return pages.response("login.html", request)
 
 @app.get("/produtos", response_class=HTMLResponse)
-async def products_page(_: Request) -> HTMLResponse:
-    template = _templates_env.get_template("products.html")
-    return HTMLResponse(template.render())
+async def products_page(request: Request) -> Response:
+    return pages.response("products.html", request)
 
 @app.get("/maquinas", response_class=HTMLResponse)
-async def machines_page(_: Request) -> HTMLResponse:
-    template = _templates_env.get_template("machines.html")
-    return HTMLResponse(template.render())
+async def machines_page(request: Request) -> Response:
+    return pages.response("machines.html", request)
 
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard_page(_: Request) -> HTMLResponse:
-    template = _templates_env.get_template("dashboard.html")
-    return HTMLResponse(template.render())
+async def dashboard_page(request: Request) -> Response:
+    return pages.response("dashboard.html", request)
 
 # API
 app.include_router(api_router, prefix="/api")
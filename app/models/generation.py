@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+from ..db.base import Base
+
+
+class DataGeneration(Base):
+    """Contador de versão por entidade, incrementado a cada escrita."""
+
+    __tablename__ = "data_generations"
+
+    entity = Column(String(32), primary_key=True)  # products | production
+    value = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from ..db.base import Base
+
+
+class IngestBatch(Base):
+    """Lote de eventos já processado, por chave de idempotência do gateway."""
+
+    __tablename__ = "ingest_batches"
+
+    key = Column(String(128), primary_key=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    accepted = Column(Integer, default=0, nullable=False)
+    result = Column(Text, nullable=False)  # resposta original (JSON)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from ..db.base import Base
 import enum
@@ -24,6 +24,13 @@ class Machine(Base):
 
 class ProductionEvent(Base):
     __tablename__ = "production_events"
+    __table_args__ = (
+        # Último evento por máquina (status) e histórico paginado por (started_at, id)
+        Index("ix_production_events_machine_started", "machine_id", "started_at", "id"),
+        # Bordas de janela do dashboard e eventos em aberto (ver services/rollups.py)
+        Index("ix_production_events_started_at", "started_at"),
+        Index("ix_production_events_ended_at", "ended_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     machine_id = Column(Integer, ForeignKey("machines.id"), nullable=False)
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Index, Integer, String, Text
 from ..db.base import Base
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Listagem paginada por (name, id)
+        Index("ix_products_name_id", "name", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String(64), unique=True, index=True, nullable=False)
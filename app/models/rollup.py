@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, UniqueConstraint
+from ..db.base import Base
+from .machine import StopReason
+
+
+class _MachineRollupMixin:
+    id = Column(Integer, primary_key=True)
+    machine_id = Column(Integer, ForeignKey("machines.id"), nullable=False)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    event_count = Column(Integer, default=0, nullable=False)
+    produced_qty = Column(Integer, default=0, nullable=False)
+    # Duração apenas de eventos encerrados; eventos em aberto são somados na leitura
+    operating_seconds = Column(Float, default=0, nullable=False)
+    stopped_seconds = Column(Float, default=0, nullable=False)
+    stop_count = Column(Integer, default=0, nullable=False)  # inclui paradas sem motivo
+    stops_falta_material = Column(Integer, default=0, nullable=False)
+    stops_manutencao = Column(Integer, default=0, nullable=False)
+    stops_falha_eletrica = Column(Integer, default=0, nullable=False)
+    stops_setup = Column(Integer, default=0, nullable=False)
+    stops_qualidade = Column(Integer, default=0, nullable=False)
+
+
+class MachineHourlyRollup(_MachineRollupMixin, Base):
+    __tablename__ = "machine_rollups_hourly"
+    __table_args__ = (UniqueConstraint("machine_id", "bucket_start", name="uq_rollups_hourly_machine_bucket"),)
+
+
+class MachineDailyRollup(_MachineRollupMixin, Base):
+    __tablename__ = "machine_rollups_daily"
+    __table_args__ = (UniqueConstraint("machine_id", "bucket_start", name="uq_rollups_daily_machine_bucket"),)
+
+
+# Coluna de contagem por motivo de parada
+STOP_REASON_COLUMNS = {reason: f"stops_{reason.value}" for reason in StopReason}
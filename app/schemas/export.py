@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+from datetime import datetime
+
+
+class ExportJobCreate(BaseModel):
+    entity: Literal["products", "production"]
+    format: Literal["csv", "xlsx"]
+    # Filtros aplicáveis apenas à produção
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    machine_id: Optional[int] = None
+
+
+class ExportJobOut(BaseModel):
+    id: str
+    entity: str
+    format: str
+    status: str  # pending | running | done | failed
+    cached: bool = False
+    rows_written: int = 0
+    rows_total: Optional[int] = None
+    progress: float = 0.0
+    error: Optional[str] = None
+    download_url: Optional[str] = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from ..models.machine import StopReason
 
 
@@ -30,7 +30,13 @@ class ProductionEventBase(BaseModel):
 
 
 class ProductionEventCreate(ProductionEventBase):
-    pass
+    @field_validator("started_at", "ended_at")
+    @classmethod
+    def naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Gravado e comparado sem fuso (UTC), como datetime.utcnow(); evita misturar naive e aware
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
 
 
 class ProductionEventOut(ProductionEventBase):
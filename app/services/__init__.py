@@ -0,0 +1 @@
+# Pacote de serviços de domínio (status, agregações, exportações)
@@ -0,0 +1,142 @@
+import logging
+import queue
+import time
+from threading import Event, Lock, Thread
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+from ..core.config import settings
+from ..db.session import SessionLocal
+from ..schemas.machine import ProductionEventCreate
+from .event_ingest import machine_directory, publish_events, write_events
+
+logger = logging.getLogger("event_buffer")
+
+_flush_seconds = Histogram("vd_event_buffer_flush_seconds", "Duração de cada commit agrupado do buffer de eventos")
+_last_flush = Gauge("vd_event_buffer_last_flush_seconds", "Duração do último commit agrupado do buffer de eventos")
+_flushed = Counter("vd_event_buffer_events_total", "Eventos processados pelo buffer", ["result"])  # written|dropped|failed
+
+
+class EventBuffer:
+    """Fila em memória de eventos de produção com gravação em segundo plano.
+
+    O evento é confirmado ao entrar na fila; uma thread grava a cada
+    `flush_ms` ms ou `flush_events` eventos, o que vier primeiro, em uma única
+    transação. Com a fila cheia, `offer` recusa (o chamador responde 429).
+    Um commit que falha é repetido até `max_retries` vezes antes de descartar
+    o lote. Eventos ainda na fila se perdem se o processo morrer sem `shutdown`.
+    """
+
+    def __init__(self, enabled: bool, max_items: int, flush_events: int, flush_ms: int, max_retries: int = 3) -> None:
+        self.enabled = enabled
+        self.flush_events = flush_events
+        self.flush_seconds = flush_ms / 1000
+        self.max_retries = max_retries
+        self._queue: queue.Queue[ProductionEventCreate] = queue.Queue(maxsize=max_items)
+        self._stop = Event()
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, event: ProductionEventCreate) -> bool:
+        if self._stop.is_set():
+            return False
+        self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            return False
+        return True
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="event-buffer", daemon=True)
+                self._thread.start()
+
+    def _take(self) -> list[ProductionEventCreate]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.flush_events:
+            remaining = 0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            if batch:
+                self._flush(batch)
+            elif self._stop.is_set():
+                return
+
+    def _write(self, batch: list[ProductionEventCreate]):
+        """Grava o lote em uma transação; devolve (eventos, máquinas) ou None se falhou."""
+        db = SessionLocal()
+        try:
+            machines = machine_directory.resolve(db, {e.machine_id for e in batch})
+            events = [e for e in batch if e.machine_id in machines]
+            write_events(db, events)
+            db.commit()
+            return events, machines
+        except Exception:  # noqa: BLE001
+            db.rollback()
+            logger.warning("event_buffer_flush_failed events=%d", len(batch), exc_info=True)
+            return None
+        finally:
+            db.close()
+
+    def _flush(self, batch: list[ProductionEventCreate]) -> None:
+        started = time.perf_counter()
+        try:
+            # Eventos já confirmados com 202: repete o commit antes de desistir do lote
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    time.sleep(min(0.5 * attempt, 5.0))
+                written = self._write(batch)
+                if written is not None:
+                    break
+            else:
+                _flushed.labels("failed").inc(len(batch))
+                logger.error("event_buffer_events_lost events=%d attempts=%d", len(batch), self.max_retries + 1)
+                return
+            events, machines = written
+            _flushed.labels("written").inc(len(events))
+            if len(events) < len(batch):
+                # Máquina removida entre o enfileiramento e a gravação
+                _flushed.labels("dropped").inc(len(batch) - len(events))
+        finally:
+            elapsed = time.perf_counter() - started
+            _flush_seconds.observe(elapsed)
+            _last_flush.set(elapsed)
+        try:
+            publish_events(events, machines)
+        except Exception:  # noqa: BLE001
+            # Já gravados: falha no quadro de status não conta como falha do lote
+            logger.exception("event_buffer_publish_failed events=%d", len(events))
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Recusa novos eventos e grava o que estiver na fila antes de encerrar."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.error("event_buffer_shutdown_timeout pending=%d", self.depth())
+            self._thread = None
+
+
+event_buffer = EventBuffer(
+    settings.EVENT_BUFFER_ENABLED,
+    settings.EVENT_BUFFER_MAX_ITEMS,
+    settings.EVENT_BUFFER_FLUSH_EVENTS,
+    settings.EVENT_BUFFER_FLUSH_MS,
+    settings.EVENT_BUFFER_MAX_RETRIES,
+)
+Gauge("vd_event_buffer_depth", "Eventos aguardando gravação no buffer").set_function(event_buffer.depth)
@@ -0,0 +1,174 @@
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Iterable, NamedTuple, Optional
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.ingest import IngestBatch
+from ..models.machine import Machine, ProductionEvent
+from ..schemas.machine import ProductionEventCreate
+from . import generations, rollups
+from .machine_status import status_board
+
+logger = logging.getLogger("event_ingest")
+_EVENT_ADAPTER = TypeAdapter(ProductionEventCreate)
+
+
+class MachineRef(NamedTuple):
+    id: int
+    name: str
+    location: Optional[str]
+
+
+class MachineDirectory:
+    """Máquinas conhecidas em memória para validar machine_id sem consulta por evento.
+
+    Recarrega após INGEST_MACHINE_CACHE_SECONDS ou quando aparece um id desconhecido
+    (máquina criada em outro worker).
+    """
+
+    def __init__(self, max_age: int) -> None:
+        self.max_age = max_age
+        self._lock = Lock()
+        self._machines: dict[int, MachineRef] = {}
+        self._loaded_at = 0.0
+
+    def resolve(self, db: Session, ids: Iterable[int]) -> dict[int, MachineRef]:
+        ids = set(ids)
+        with self._lock:
+            fresh = time.monotonic() - self._loaded_at <= self.max_age
+            if fresh and ids <= self._machines.keys():
+                return {i: self._machines[i] for i in ids}
+        # Consulta fora do lock: com DB_ASYNC roda na thread do event loop (run_sync) e
+        # outra requisição esperando o lock travaria o loop
+        rows = db.query(Machine.id, Machine.name, Machine.location).all()
+        machines = {r.id: MachineRef(r.id, r.name, r.location) for r in rows}
+        with self._lock:
+            self._machines = machines
+            self._loaded_at = time.monotonic()
+            return {i: machines[i] for i in ids if i in machines}
+
+    def add(self, machine: Machine) -> None:
+        with self._lock:
+            if self._loaded_at:
+                self._machines[machine.id] = MachineRef(machine.id, machine.name, machine.location)
+
+
+machine_directory = MachineDirectory(settings.INGEST_MACHINE_CACHE_SECONDS)
+
+
+def write_events(db: Session, events: list[ProductionEventCreate]) -> None:
+    """Insere eventos com um único executemany e atualiza rollups/geração (sem commit)."""
+    if not events:
+        return
+    db.execute(insert(ProductionEvent), [e.model_dump() for e in events])
+    rollups.record_events(db, events)
+    generations.bump(db, generations.PRODUCTION)
+
+
+def publish_events(events: list[ProductionEventCreate], machines: dict[int, MachineRef]) -> None:
+    """Após o commit: atualiza o quadro de status com o evento mais recente de cada máquina."""
+    latest: dict[int, ProductionEventCreate] = {}
+    for e in events:
+        current = latest.get(e.machine_id)
+        if current is None or e.started_at >= current.started_at:
+            latest[e.machine_id] = e
+    for machine_id, event in latest.items():
+        status_board.event_recorded(machines[machine_id], event)
+
+
+def parse_records(body: bytes, ndjson: bool) -> list:
+    """Registros brutos de um array JSON ou NDJSON; linhas NDJSON inválidas viram ValueError no item."""
+    if not ndjson:
+        records = json.loads(body)
+        if not isinstance(records, list):
+            raise ValueError("o corpo deve ser um array JSON")
+        return records
+    records = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as exc:
+            records.append(ValueError(f"JSON inválido: {exc}"))
+    return records
+
+
+def _cutoff(now: datetime) -> datetime:
+    return now - timedelta(seconds=settings.INGEST_IDEMPOTENCY_TTL_SECONDS)
+
+
+def _stored(db: Session, key: str) -> Optional[dict]:
+    # Chave vencida (ainda não limpa) não conta como repetição
+    row = (
+        db.query(IngestBatch)
+        .filter(IngestBatch.key == key, IngestBatch.created_at >= _cutoff(datetime.utcnow()))
+        .first()
+    )
+    if row is None:
+        return None
+    result = json.loads(row.result)
+    result["replayed"] = True
+    return result
+
+
+def ingest(db: Session, records: list, idempotency_key: Optional[str] = None) -> dict:
+    """Valida e grava um lote de eventos em uma transação.
+
+    Registros inválidos (schema ou máquina inexistente) são reportados por
+    índice e não impedem os demais. Com chave de idempotência, uma repetição
+    do mesmo lote devolve a resposta original sem gravar de novo.
+    """
+    if idempotency_key:
+        stored = _stored(db, idempotency_key)
+        if stored is not None:
+            return stored
+
+    errors: list[dict] = []
+    valid: list[tuple[int, ProductionEventCreate]] = []
+    for index, record in enumerate(records):
+        if isinstance(record, Exception):
+            errors.append({"index": index, "detail": str(record)})
+            continue
+        try:
+            valid.append((index, _EVENT_ADAPTER.validate_python(record)))
+        except ValidationError as exc:
+            errors.append({"index": index, "detail": exc.errors(include_url=False, include_context=False)})
+
+    machines = machine_directory.resolve(db, (e.machine_id for _, e in valid))
+    events = []
+    for index, event in valid:
+        if event.machine_id in machines:
+            events.append(event)
+        else:
+            errors.append({"index": index, "detail": "Máquina não encontrada"})
+    errors.sort(key=lambda e: e["index"])
+
+    result = {"accepted": len(events), "rejected": len(errors), "errors": errors, "replayed": False}
+    write_events(db, events)
+    if idempotency_key:
+        now = datetime.utcnow()
+        # Limpeza oportunista das chaves vencidas, antes do insert (a mesma chave pode estar vencida)
+        db.query(IngestBatch).filter(IngestBatch.created_at < _cutoff(now)).delete(synchronize_session=False)
+        db.add(IngestBatch(key=idempotency_key, created_at=now, accepted=len(events), result=json.dumps(result, default=str)))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Mesma chave gravada por uma requisição concorrente
+        db.rollback()
+        stored = _stored(db, idempotency_key) if idempotency_key else None
+        if stored is None:
+            raise
+        return stored
+    try:
+        publish_events(events, machines)
+    except Exception:
+        # Eventos já gravados: falha no quadro de status não pode virar 500 (o cliente repetiria o lote)
+        logger.exception("event_ingest_publish_failed events=%d", len(events))
+    return result
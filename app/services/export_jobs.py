@@ -0,0 +1,228 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Optional
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..db.session import ReadSessionLocal
+from . import generations
+from .exports import (
+    PRODUCT_COLUMNS,
+    PRODUCTION_COLUMNS,
+    iter_csv,
+    product_count,
+    product_rows,
+    production_count,
+    production_rows,
+    write_xlsx,
+)
+
+logger = logging.getLogger("export_jobs")
+
+# entidade -> (colunas, linhas, contagem, geração)
+_ENTITIES = {
+    "products": (PRODUCT_COLUMNS, product_rows, product_count, generations.PRODUCTS),
+    "production": (PRODUCTION_COLUMNS, production_rows, production_count, generations.PRODUCTION),
+}
+
+
+def _begin_snapshot(db: Session) -> None:
+    """Abre a transação de leitura com snapshot único para as consultas seguintes da sessão."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    elif dialect == "sqlite":
+        # pysqlite não abre transação para SELECT: sem BEGIN cada consulta vê um snapshot diferente
+        db.connection().exec_driver_sql("BEGIN")
+
+
+class ExportJob:
+    def __init__(self, entity: str, fmt: str, filters: dict, key: str, path: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.entity = entity
+        self.format = fmt
+        self.filters = filters
+        self.key = key
+        self.path = path
+        self.status = "pending"
+        self.cached = False
+        self.rows_written = 0
+        self.rows_total: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        if self.status == "done":
+            progress = 1.0
+        elif self.rows_total:
+            progress = min(self.rows_written / self.rows_total, 1.0)
+        else:
+            progress = 0.0
+        return {
+            "id": self.id,
+            "entity": self.entity,
+            "format": self.format,
+            "status": self.status,
+            "cached": self.cached,
+            "rows_written": self.rows_written,
+            "rows_total": self.rows_total,
+            "progress": progress,
+            "error": self.error,
+            "download_url": f"/api/export/jobs/{self.id}/download" if self.status == "done" else None,
+        }
+
+
+class ExportJobManager:
+    """Exportações em segundo plano com artefatos endereçados por conteúdo.
+
+    A chave do artefato combina entidade, formato, filtros e a geração dos
+    dados; enquanto nenhuma escrita incrementar a geração, o mesmo arquivo é
+    reaproveitado. Os jobs ficam na memória do processo: com vários workers,
+    status e download precisam cair no mesmo worker (sticky) ou use um só.
+    """
+
+    def __init__(self, directory: str, workers: int, max_jobs: int = 500) -> None:
+        self.directory = directory
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: OrderedDict[str, ExportJob] = OrderedDict()
+        self._active: dict[str, ExportJob] = {}
+        self._lock = Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export")
+        return self._executor
+
+    def _artifact_key(self, entity: str, fmt: str, filters: dict, generation: int) -> str:
+        payload = json.dumps(
+            {"entity": entity, "format": fmt, "filters": filters, "generation": generation},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def submit(self, db: Session, entity: str, fmt: str, filters: dict) -> ExportJob:
+        # Filtros só se aplicam à produção
+        filters = {k: v for k, v in filters.items() if v is not None} if entity == "production" else {}
+        generation = generations.current(db, _ENTITIES[entity][3])
+        key = self._artifact_key(entity, fmt, filters, generation)
+        path = os.path.join(self.directory, f"{key}.{fmt}")
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None:
+                return active
+            job = ExportJob(entity, fmt, filters, key, path)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            if os.path.exists(path):
+                os.utime(path)  # renova para a limpeza por idade/LRU
+                job.status = "done"
+                job.cached = True
+                return job
+            self._active[key] = job
+        self._pool().submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _counted(self, job: ExportJob, rows):
+        for row in rows:
+            job.rows_written += 1
+            yield row
+
+    def _run(self, job: ExportJob) -> None:
+        job.status = "running"
+        active_key = job.key
+        columns, rows_fn, count_fn, entity_generation = _ENTITIES[job.entity]
+        db = ReadSessionLocal()
+        tmp = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Geração, contagem e linhas no mesmo snapshot: o arquivo leva a chave dos dados que contém
+            _begin_snapshot(db)
+            generation = generations.current(db, entity_generation)
+            job.key = self._artifact_key(job.entity, job.format, job.filters, generation)
+            job.path = os.path.join(self.directory, f"{job.key}.{job.format}")
+            if os.path.exists(job.path):
+                # Mesmo conteúdo já gerado (dados mudaram entre o submit e a execução)
+                os.utime(job.path)
+                job.status = "done"
+                job.cached = True
+                return
+            job.rows_total = count_fn(db, **job.filters)
+            rows = self._counted(job, rows_fn(db, settings.EXPORT_BATCH_SIZE, **job.filters))
+            if job.format == "csv":
+                fd, tmp = tempfile.mkstemp(prefix="vectradex-", suffix=".part", dir=self.directory)
+                with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                    for chunk in iter_csv(columns, rows):
+                        f.write(chunk)
+            else:
+                tmp = write_xlsx(job.entity, columns, rows, directory=self.directory)
+            os.replace(tmp, job.path)
+            job.status = "done"
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("export_job_failed id=%s", job.id)
+            job.status = "failed"
+            job.error = str(exc)
+            if tmp and os.path.exists(tmp):
+                os.unlink(tmp)
+        finally:
+            db.close()
+            with self._lock:
+                self._active.pop(active_key, None)
+        self.cleanup(keep=job.path)
+
+    def cleanup(self, keep: Optional[str] = None) -> None:
+        """Remove artefatos vencidos e, acima do limite de tamanho, os menos usados.
+
+        Temporários `vectradex-*` (em escrita) só saem depois da idade máxima:
+        sobras de jobs interrompidos por queda ou cancelamento.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        now = time.time()
+        files = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if path == keep:
+                continue
+            try:
+                st = os.stat(path)
+                if now - st.st_mtime > settings.EXPORT_ARTIFACT_MAX_AGE_SECONDS:
+                    os.unlink(path)
+                elif name.startswith("vectradex-"):  # em escrita (talvez por outro worker)
+                    continue
+                else:
+                    files.append((st.st_mtime, st.st_size, path))
+            except FileNotFoundError:
+                continue
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= settings.EXPORT_ARTIFACT_MAX_BYTES:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+export_jobs = ExportJobManager(settings.EXPORT_ARTIFACT_DIR, settings.EXPORT_JOB_WORKERS)
@@ -0,0 +1,115 @@
+import csv
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+from typing import Callable, Iterator, Optional
+from openpyxl import Workbook
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..db.session import ReadSessionLocal
+from ..models.machine import ProductionEvent
+from ..models.product import Product
+
+PRODUCT_COLUMNS = ("id", "code", "name", "description", "quantity", "unit", "location")
+PRODUCTION_COLUMNS = ("id", "machine_id", "started_at", "ended_at", "status", "stop_reason", "quantity")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def product_rows(db: Session, batch_size: int) -> Iterator[tuple]:
+    q = db.query(*[getattr(Product, c) for c in PRODUCT_COLUMNS]).order_by(Product.id)
+    for row in q.yield_per(batch_size):
+        yield tuple(row)
+
+
+def product_count(db: Session) -> int:
+    return db.query(Product.id).count()
+
+
+def _production_query(query, start, end, machine_id):
+    if machine_id is not None:
+        query = query.filter(ProductionEvent.machine_id == machine_id)
+    if start:
+        query = query.filter(ProductionEvent.started_at >= start)
+    if end:
+        query = query.filter(ProductionEvent.started_at <= end)
+    return query
+
+
+def production_rows(
+    db: Session,
+    batch_size: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    machine_id: Optional[int] = None,
+) -> Iterator[tuple]:
+    q = db.query(*[getattr(ProductionEvent, c) for c in PRODUCTION_COLUMNS])
+    q = _production_query(q, start, end, machine_id)
+    reason_idx = PRODUCTION_COLUMNS.index("stop_reason")
+    for row in q.order_by(ProductionEvent.id).yield_per(batch_size):
+        row = list(row)
+        row[reason_idx] = str(row[reason_idx]) if row[reason_idx] else None
+        yield tuple(row)
+
+
+def production_count(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    machine_id: Optional[int] = None,
+) -> int:
+    return _production_query(db.query(ProductionEvent.id), start, end, machine_id).count()
+
+
+def iter_rows(rows_fn: Callable[..., Iterator[tuple]], **filters) -> Iterator[tuple]:
+    """Linhas de uma exportação com sessão própria.
+
+    A sessão de `get_db` é fechada antes de a resposta começar a ser
+    enviada, então o gerador abre e fecha a sua (no pool de leitura).
+    """
+    db = ReadSessionLocal()
+    try:
+        yield from rows_fn(db, settings.EXPORT_BATCH_SIZE, **filters)
+    finally:
+        db.close()
+
+
+def iter_csv(columns: tuple, rows: Iterator[tuple]) -> Iterator[str]:
+    """CSV em blocos de EXPORT_BATCH_SIZE linhas (cursor do servidor, memória constante)."""
+    buf = StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= settings.EXPORT_BATCH_SIZE:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
+
+
+def write_xlsx(sheet_name: str, columns: tuple, rows: Iterator[tuple], directory: Optional[str] = None) -> str:
+    """Grava um XLSX em arquivo temporário com workbook write-only (sem pandas).
+
+    As linhas vão direto para o XML da planilha, sem árvore de células em
+    memória. Retorna o caminho do arquivo; quem chama deve removê-lo.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name)
+    ws.append(columns)
+    for row in rows:
+        ws.append(row)
+    fd, path = tempfile.mkstemp(prefix="vectradex-", suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        wb.save(path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
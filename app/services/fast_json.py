@@ -0,0 +1,23 @@
+from typing import Iterable, Optional
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def schema_columns(model, schema: type[BaseModel]) -> list:
+    """Colunas do modelo ORM na ordem dos campos do schema de saída (mesmo JSON do response_model)."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def json_response(content, response: Optional[Response] = None) -> ORJSONResponse:
+    """Serializa com orjson; leva os cabeçalhos definidos na Response injetada (ex.: X-Next-Cursor).
+
+    Devolver uma Response pula a validação do response_model: use só com dados
+    vindos do banco nos tipos do schema. O schema do OpenAPI não muda.
+    """
+    return ORJSONResponse(content, headers=dict(response.headers) if response is not None else None)
+
+
+def rows_response(rows: Iterable, response: Optional[Response] = None) -> ORJSONResponse:
+    """Linhas de uma consulta por colunas (Row) direto para JSON, sem objetos ORM nem modelos Pydantic."""
+    return json_response([row._asdict() for row in rows], response)
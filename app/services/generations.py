@@ -0,0 +1,36 @@
+from sqlalchemy.orm import Session
+from ..models.generation import DataGeneration
+
+PRODUCTS = "products"
+PRODUCTION = "production"
+
+
+def bump(db: Session, entity: str) -> None:
+    """Incrementa a geração da entidade na transação corrente (sem commit)."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        table = DataGeneration.__table__
+        stmt = insert(table).values(entity=entity, value=1)
+        stmt = stmt.on_conflict_do_update(index_elements=["entity"], set_={"value": table.c.value + 1})
+        db.execute(stmt)
+        return
+    row = db.get(DataGeneration, entity)
+    if row is None:
+        db.add(DataGeneration(entity=entity, value=1))
+    else:
+        row.value += 1
+
+
+def current(db: Session, entity: str) -> int:
+    row = db.get(DataGeneration, entity)
+    return row.value if row else 0
+
+
+def current_many(db: Session, *entities: str) -> tuple[int, ...]:
+    """Gerações de várias entidades em uma consulta, na ordem pedida."""
+    rows = dict(db.query(DataGeneration.entity, DataGeneration.value).filter(DataGeneration.entity.in_(entities)).all())
+    return tuple(rows.get(entity, 0) for entity in entities)
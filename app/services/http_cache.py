@@ -0,0 +1,50 @@
+import gzip
+from typing import Optional
+
+try:  # brotli vem no requirements.txt; sem o pacote (instalação mínima) só há gzip
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+# Ordem de preferência ao negociar Accept-Encoding
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara If-None-Match com a ETag (comparação fraca, como pede a RFC 9110 para GET)."""
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set[str]:
+    """Codificações aceitas pelo cliente (ignora as com q=0)."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def negotiate(accept_encoding: Optional[str], available) -> Optional[str]:
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in ENCODINGS:
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    # mtime=0: bytes iguais para o mesmo conteúdo (ETag estável entre workers)
+    return gzip.compress(data, compresslevel=9, mtime=0)
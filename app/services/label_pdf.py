@@ -0,0 +1,176 @@
+import zlib
+from itertools import groupby
+from typing import Iterator
+from .labels import code128_modules
+
+_MM = 72 / 25.4  # pontos por mm
+A4_MM = (210.0, 297.0)
+
+# Fontes padrão do PDF (não embutidas): nome em Helvetica-Bold, código em Courier (monoespaçada, 600/1000 em)
+_FONTS = (
+    b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+)
+_COURIER_ADVANCE = 0.6
+_HELVETICA_AVG_ADVANCE = 0.58
+_QUIET_MODULES = 10
+
+
+class SheetLayout:
+    """Disposição das etiquetas na página (medidas em mm).
+
+    `grid`: folha (ex.: A4) com colunas x linhas; `roll`: uma etiqueta por
+    página, no tamanho da etiqueta, para impressoras térmicas de bobina.
+    """
+
+    def __init__(
+        self,
+        page_mm: tuple[float, float],
+        columns: int = 1,
+        rows: int = 1,
+        margin_mm: float = 0.0,
+        gap_mm: float = 0.0,
+    ) -> None:
+        self.page_w, self.page_h = page_mm[0] * _MM, page_mm[1] * _MM
+        self.columns, self.rows = columns, rows
+        margin, gap = margin_mm * _MM, gap_mm * _MM
+        self.cell_w = (self.page_w - 2 * margin - (columns - 1) * gap) / columns
+        self.cell_h = (self.page_h - 2 * margin - (rows - 1) * gap) / rows
+        # Origem (canto inferior esquerdo) de cada célula, linha a linha a partir do topo
+        self.cells = [
+            (margin + c * (self.cell_w + gap), self.page_h - margin - (r + 1) * self.cell_h - r * gap)
+            for r in range(rows)
+            for c in range(columns)
+        ]
+
+    @classmethod
+    def grid(cls, columns: int, rows: int, margin_mm: float = 5.0, gap_mm: float = 2.0) -> "SheetLayout":
+        return cls(A4_MM, columns, rows, margin_mm, gap_mm)
+
+    @classmethod
+    def roll(cls, width_mm: float, height_mm: float) -> "SheetLayout":
+        return cls((width_mm, height_mm))
+
+
+def _pdf_text(value: str) -> bytes:
+    raw = value.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _num(value: float) -> bytes:
+    return f"{value:.2f}".rstrip("0").rstrip(".").encode("ascii")
+
+
+def _label_content(code: str, name: str, width: float, height: float) -> bytes:
+    """Operadores PDF de uma etiqueta (nome, barras vetoriais e código) em coordenadas da célula."""
+    pad = min(2 * _MM, width * 0.04, height * 0.08)
+    font_size = max(4.0, min(9.0, height * 0.12))
+    modules = code128_modules(code)
+    module = (width - 2 * pad) / (len(modules) + 2 * _QUIET_MODULES)
+    bar_bottom = pad + font_size + 1 * _MM
+    bar_top = height - pad - font_size - 1 * _MM
+    x = pad + _QUIET_MODULES * module
+
+    ops = [b"0 g"]
+    for bit, run in groupby(modules):
+        run_w = len(list(run)) * module
+        if bit == "1":
+            ops.append(b"%s %s %s %s re" % (_num(x), _num(bar_bottom), _num(run_w), _num(bar_top - bar_bottom)))
+        x += run_w
+    ops.append(b"f")
+
+    max_chars = max(1, int((width - 2 * pad) / (font_size * _HELVETICA_AVG_ADVANCE)))
+    title = name if len(name) <= max_chars else name[: max(1, max_chars - 3)] + "..."
+    ops.append(b"BT /F1 %s Tf %s %s Td (%s) Tj ET" % (_num(font_size), _num(pad), _num(height - pad - font_size), _pdf_text(title)))
+    code_w = len(code) * font_size * _COURIER_ADVANCE
+    ops.append(b"BT /F2 %s Tf %s %s Td (%s) Tj ET" % (_num(font_size), _num((width - code_w) / 2), _num(pad), _pdf_text(code)))
+    return b"\n".join(ops)
+
+
+class _PdfStream:
+    """Escreve objetos PDF em sequência, registrando offsets para a tabela xref."""
+
+    def __init__(self) -> None:
+        self.offsets: dict[int, int] = {}
+        self.position = 0
+        self._next = 1
+
+    def reserve(self) -> int:
+        num = self._next
+        self._next += 1
+        return num
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def obj(self, num: int, body: bytes) -> bytes:
+        self.offsets[num] = self.position
+        return self._emit(b"%d 0 obj\n%s\nendobj\n" % (num, body))
+
+    def stream(self, num: int, data: bytes, entries: bytes = b"") -> bytes:
+        packed = zlib.compress(data)
+        body = b"<< %s /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (entries, len(packed), packed)
+        return self.obj(num, body)
+
+    def trailer(self, root: int) -> bytes:
+        size = self._next
+        lines = [b"xref", b"0 %d" % size, b"0000000000 65535 f "]
+        lines += [b"%010d 00000 n " % self.offsets[n] for n in range(1, size)]
+        xref_at = self.position
+        lines += [b"trailer", b"<< /Size %d /Root %d 0 R >>" % (size, root), b"startxref", b"%d" % xref_at, b"%%EOF", b""]
+        return self._emit(b"\n".join(lines))
+
+
+def iter_label_pdf(items: list[tuple[str, str]], copies: int, layout: SheetLayout) -> Iterator[bytes]:
+    """PDF multi-etiquetas gerado em fluxo.
+
+    Cada produto vira um Form XObject desenhado `copies` vezes, então o
+    tamanho do arquivo cresce com o nº de produtos e não de etiquetas.
+    """
+    pdf = _PdfStream()
+    catalog, pages, font_name, font_code = (pdf.reserve() for _ in range(4))
+    yield pdf.header()
+    yield pdf.obj(font_name, _FONTS[0])
+    yield pdf.obj(font_code, _FONTS[1])
+    resources = b"<< /Font << /F1 %d 0 R /F2 %d 0 R >> >>" % (font_name, font_code)
+    bbox = b"[0 0 %s %s]" % (_num(layout.cell_w), _num(layout.cell_h))
+    media_box = b"[0 0 %s %s]" % (_num(layout.page_w), _num(layout.page_h))
+
+    kids: list[int] = []
+    placed: list[tuple[int, int]] = []  # (slot, xobject) da página corrente
+
+    def _flush_page() -> Iterator[bytes]:
+        content = b"\n".join(
+            b"q 1 0 0 1 %s %s cm /L%d Do Q" % (_num(layout.cells[slot][0]), _num(layout.cells[slot][1]), xobj)
+            for slot, xobj in placed
+        )
+        xobjects = b" ".join(b"/L%d %d 0 R" % (xobj, xobj) for xobj in sorted({x for _, x in placed}))
+        content_num, page_num = pdf.reserve(), pdf.reserve()
+        yield pdf.stream(content_num, content)
+        yield pdf.obj(
+            page_num,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox %s /Resources << /XObject << %s >> >> /Contents %d 0 R >>"
+            % (pages, media_box, xobjects, content_num),
+        )
+        kids.append(page_num)
+        placed.clear()
+
+    per_page = len(layout.cells)
+    for code, name in items:
+        xobj = pdf.reserve()
+        content = _label_content(code, name, layout.cell_w, layout.cell_h)
+        yield pdf.stream(xobj, content, b"/Type /XObject /Subtype /Form /BBox %s /Resources %s" % (bbox, resources))
+        for _ in range(copies):
+            placed.append((len(placed), xobj))
+            if len(placed) == per_page:
+                yield from _flush_page()
+    if placed or not kids:
+        yield from _flush_page()
+
+    yield pdf.obj(pages, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+    yield pdf.obj(catalog, b"<< /Type /Catalog /Pages %d 0 R >>" % pages)
+    yield pdf.trailer(catalog)
@@ -0,0 +1,286 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from itertools import groupby
+from threading import Lock, get_ident
+from typing import Iterator, Optional
+from PIL import Image, ImageDraw, ImageFont
+import barcode
+from ..core.config import settings
+
+logger = logging.getLogger("labels")
+
+# Incrementar quando o layout da etiqueta mudar (invalida caches e ETags)
+LAYOUT_VERSION = 2
+
+
+# Geometria do Code128 idêntica à do ImageWriter do python-barcode (300 dpi)
+_DPI = 300
+_MODULE_MM = 0.2
+_QUIET_ZONE_MM = 2.54
+_BAR_HEIGHT_MM = 15.0
+_MARGIN_MM = 1.0
+_TEXT_DISTANCE_MM = 1.0
+_FONT_PT = 10
+_PT_MM = 0.352777778
+_BARCODE_FONT_PATH = os.path.join(os.path.dirname(barcode.__file__), "fonts", "DejaVuSansMono.ttf")
+
+
+def _mm2px(mm: float) -> float:
+    return mm * _DPI / 25.4
+
+
+@lru_cache(maxsize=1)
+def _barcode_font() -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(_BARCODE_FONT_PATH, int(_mm2px(_FONT_PT * _PT_MM)))
+
+
+@lru_cache(maxsize=1)
+def _label_font():
+    return ImageFont.load_default()
+
+
+def code128_modules(code: str) -> str:
+    """Padrão de módulos ("1" barra, "0" espaço) do símbolo Code128."""
+    return barcode.get_barcode_class("code128")(code).build()[0]
+
+
+def _barcode_image(code: str) -> Image.Image:
+    """Desenha o Code128 direto em tons de cinza a partir do padrão de módulos.
+
+    Uma única linha de pixels é montada a partir das sequências de módulos e
+    esticada na altura das barras, sem passar por PNG intermediário.
+    """
+    modules = code128_modules(code)
+    width_mm = 2 * _QUIET_ZONE_MM + len(modules) * _MODULE_MM
+    height_mm = 2 * _MARGIN_MM + _BAR_HEIGHT_MM + _FONT_PT * _PT_MM / 2 + _TEXT_DISTANCE_MM
+    width, height = int(_mm2px(width_mm)), int(_mm2px(height_mm))
+
+    row = bytearray(b"\xff") * width
+    xpos = _QUIET_ZONE_MM
+    for bit, run in groupby(modules):
+        run_mm = len(list(run)) * _MODULE_MM
+        # Mesmo arredondamento do ImageDraw.rectangle (truncado, extremos inclusivos)
+        x0, x1 = int(_mm2px(xpos)), int(_mm2px(xpos + run_mm) - 1)
+        row[x0 : x1 + 1] = (b"\x00" if bit == "1" else b"\xff") * (x1 + 1 - x0)
+        xpos += run_mm
+
+    y0, y1 = int(_mm2px(_MARGIN_MM)), int(_mm2px(_MARGIN_MM + _BAR_HEIGHT_MM))
+    bars = Image.frombytes("L", (width, 1), bytes(row)).resize((width, y1 + 1 - y0), Image.NEAREST)
+    img = Image.new("L", (width, height), 255)
+    img.paste(bars, (0, y0))
+    text_x = _QUIET_ZONE_MM + len(modules) * _MODULE_MM / 2
+    text_y = _MARGIN_MM + _BAR_HEIGHT_MM + _TEXT_DISTANCE_MM
+    ImageDraw.Draw(img).text((_mm2px(text_x), _mm2px(text_y)), code, font=_barcode_font(), fill=0, anchor="md")
+    return img
+
+
+def render_label_image(code: str, name: str) -> Image.Image:
+    """Etiqueta simples (nome + código de barras + código) em tons de cinza.
+
+    Levanta ValueError se o código não puder ser codificado em Code128.
+    """
+    try:
+        img = _barcode_image(code)
+    except Exception as exc:  # noqa: BLE001
+        raise ValueError(str(exc)) from exc
+    canvas = Image.new("L", (max(300, img.width + 20), img.height + 60), 255)
+    canvas.paste(img, (10, 40))
+    draw = ImageDraw.Draw(canvas)
+    font = _label_font()
+    draw.text((10, 5), f"{name}", fill=0, font=font)
+    draw.text((10, img.height + 40), f"{code}", fill=0, font=font)
+    return canvas
+
+
+def render_label_png(code: str, name: str) -> bytes:
+    out = BytesIO()
+    render_label_image(code, name).save(out, format="PNG")
+    return out.getvalue()
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:24]
+
+
+def label_key(code: str, name: str) -> str:
+    """Chave da etiqueta: prefixo pelo código (para invalidação) + conteúdo/layout."""
+    return f"{_digest(code)}-{_digest(LAYOUT_VERSION, name)}"
+
+
+class LabelCache:
+    """Cache LRU de PNGs prontos, em memória com camada opcional em disco."""
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.directory = directory
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            if key in self._items:
+                return True
+        return bool(self.directory) and os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                return data
+        if self.directory:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                return data
+        return None
+
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = f"{self._path(key)}.{os.getpid()}.{get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except OSError:
+                logger.warning("label_cache_write_failed key=%s", key)
+
+    def invalidate_code(self, code: str) -> None:
+        """Remove todas as variantes (nome/layout) de um código."""
+        prefix = f"{_digest(code)}-"
+        with self._lock:
+            for key in [k for k in self._items if k.startswith(prefix)]:
+                del self._items[key]
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.startswith(prefix):
+                    try:
+                        os.unlink(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+
+
+label_cache = LabelCache(settings.LABEL_CACHE_MAX_ENTRIES, settings.LABEL_CACHE_DIR)
+
+
+def label_png(code: str, name: str) -> tuple[bytes, str]:
+    """PNG da etiqueta (via cache) e a chave usada como ETag."""
+    key = label_key(code, name)
+    data = label_cache.get(key)
+    if data is None:
+        data = render_label_png(code, name)
+        label_cache.put(key, data)
+    return data, key
+
+
+# Lotes menores que isso são renderizados na própria thread (custo do pool não compensa)
+_MIN_POOL_BATCH = 16
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = Lock()
+
+
+def _pool() -> Optional[ProcessPoolExecutor]:
+    global _render_pool
+    if settings.LABEL_BATCH_WORKERS == 0:
+        return None
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn: criado durante uma requisição, com threads (flush, bcrypt, anyio) já rodando;
+            # um fork herdaria locks presos (logging, pool do SQLAlchemy)
+            _render_pool = ProcessPoolExecutor(
+                max_workers=settings.LABEL_BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _render_pool
+
+
+def shutdown_pool() -> None:
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+def render_batch(items: list[tuple[str, str]]) -> Iterator[tuple[str, bytes, bool]]:
+    """Gera (código, PNG, veio_do_cache) na ordem dos itens.
+
+    Só as etiquetas ausentes do cache são distribuídas no pool de processos;
+    os resultados são consumidos conforme ficam prontos.
+    """
+    keys = [label_key(code, name) for code, name in items]
+    missing = [i for i, key in enumerate(keys) if not label_cache.contains(key)]
+    rendered: Iterator[bytes] = iter(())
+    if missing:
+        codes = [items[i][0] for i in missing]
+        names = [items[i][1] for i in missing]
+        pool = _pool() if len(missing) >= _MIN_POOL_BATCH else None
+        if pool is not None:
+            workers = settings.LABEL_BATCH_WORKERS or os.cpu_count() or 1
+            chunksize = max(1, len(missing) // (workers * 4))
+            rendered = pool.map(render_label_png, codes, names, chunksize=chunksize)
+        else:
+            rendered = map(render_label_png, codes, names)
+    missing_set = set(missing)
+    for i, (code, name) in enumerate(items):
+        if i in missing_set:
+            data = next(rendered)
+            label_cache.put(keys[i], data)
+            cached = False
+        else:
+            data = label_cache.get(keys[i])
+            cached = data is not None
+            if data is None:  # removido do cache no meio do lote
+                data = render_label_png(code, name)
+        yield code, data, cached
+
+
+class _ZipSink:
+    """Destino não-posicionável para o zipfile; acumula bytes até serem drenados."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterator[tuple[str, bytes]]) -> Iterator[bytes]:
+    """ZIP gerado em fluxo; PNG já é comprimido, então as entradas são armazenadas (STORED)."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,131 @@
+from threading import Lock
+from typing import Callable, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.machine import Machine, ProductionEvent
+
+
+def _row(machine_id: int, name: str, location: Optional[str], event) -> dict:
+    return {
+        "id": machine_id,
+        "name": name,
+        "location": location,
+        "status": event.status if event else "unknown",
+        "stop_reason": getattr(event.stop_reason, "value", event.stop_reason) if event and event.stop_reason else None,
+        "last_started_at": event.started_at.isoformat() if event else None,
+        "last_ended_at": event.ended_at.isoformat() if event and event.ended_at else None,
+        "last_quantity": event.quantity if event else 0,
+    }
+
+
+def load_status(db: Session) -> list[dict]:
+    """Status de todas as máquinas em uma única consulta (último evento via ROW_NUMBER)."""
+    ranked = (
+        db.query(
+            ProductionEvent.machine_id.label("machine_id"),
+            ProductionEvent.status.label("status"),
+            ProductionEvent.stop_reason.label("stop_reason"),
+            ProductionEvent.started_at.label("started_at"),
+            ProductionEvent.ended_at.label("ended_at"),
+            ProductionEvent.quantity.label("quantity"),
+            func.row_number()
+            .over(
+                partition_by=ProductionEvent.machine_id,
+                order_by=(ProductionEvent.started_at.desc(), ProductionEvent.id.desc()),
+            )
+            .label("rn"),
+        )
+        .subquery()
+    )
+    rows = (
+        db.query(Machine.id, Machine.name, Machine.location, ranked)
+        .outerjoin(ranked, (ranked.c.machine_id == Machine.id) & (ranked.c.rn == 1))
+        .order_by(Machine.name.asc())
+        .all()
+    )
+    return [_row(r.id, r.name, r.location, r if r.started_at is not None else None) for r in rows]
+
+
+class MachineStatusBoard:
+    """Tabela em memória do estado atual por máquina, atualizada nas escritas.
+
+    Só é consistente com um único processo escrevendo; com vários workers
+    cada um enxerga apenas as próprias escritas. Os listeners recebem cada
+    linha alterada (mesmo com o cache desativado), na thread que fez a escrita;
+    eventos retroativos, mais antigos que o último conhecido da máquina, não
+    são repassados.
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._lock = Lock()
+        self._rows: dict[int, dict] = {}
+        self._loaded = False
+        # Conta escritas/invalidações: carga que cruzou com uma delas não é guardada
+        self._version = 0
+        # Último started_at conhecido por máquina (também com o cache desativado): filtra eventos retroativos
+        self._latest: dict[int, str] = {}
+        self._listeners: list[Callable[[dict], None]] = []
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def _changed(self, row: dict) -> None:
+        for listener in self._listeners:
+            listener(row)
+
+    def _remember(self, rows: list[dict]) -> None:
+        with self._lock:
+            for r in rows:
+                started = r["last_started_at"]
+                if started and started > self._latest.get(r["id"], ""):
+                    self._latest[r["id"]] = started
+
+    def snapshot(self, db: Session) -> list[dict]:
+        if not self.enabled:
+            rows = load_status(db)
+            self._remember(rows)
+            return rows
+        with self._lock:
+            if self._loaded:
+                return sorted(self._rows.values(), key=lambda r: r["name"])
+            version = self._version
+        # Consulta fora do lock: com DB_ASYNC roda na thread do event loop (run_sync)
+        rows = load_status(db)
+        self._remember(rows)
+        with self._lock:
+            if not self._loaded and self._version == version:
+                self._rows = {r["id"]: r for r in rows}
+                self._loaded = True
+        return rows
+
+    def machine_added(self, machine: Machine) -> None:
+        row = _row(machine.id, machine.name, machine.location, None)
+        with self._lock:
+            self._version += 1
+            if self._loaded:
+                self._rows[machine.id] = row
+        self._changed(row)
+
+    def event_recorded(self, machine: Machine, event: ProductionEvent) -> None:
+        row = _row(machine.id, machine.name, machine.location, event)
+        with self._lock:
+            self._version += 1
+            # Eventos retroativos (ex.: reenvio de gateway) não são o estado atual: nem cache nem listeners
+            if self._latest.get(machine.id, "") > row["last_started_at"]:
+                return
+            self._latest[machine.id] = row["last_started_at"]
+            if self._loaded:
+                self._rows[machine.id] = row
+        self._changed(row)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._rows = {}
+            self._latest = {}
+            self._loaded = False
+
+
+status_board = MachineStatusBoard(enabled=settings.MACHINE_STATUS_CACHE)
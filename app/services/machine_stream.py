@@ -0,0 +1,135 @@
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Optional
+from prometheus_client import Counter, Gauge
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from ..core.config import settings
+from .machine_status import status_board
+
+_subscribers = Gauge("vd_machine_stream_subscribers", "Conexões abertas em /api/machines/stream")
+_resyncs = Counter("vd_machine_stream_resyncs_total", "Snapshots reenviados a assinantes que não acompanharam as mudanças")
+
+# Marcador na fila do assinante: reenviar o snapshot completo
+_RESYNC = None
+
+
+def sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+class StatusBroadcaster:
+    """Distribui as mudanças do quadro de status para as conexões SSE.
+
+    Cada mudança é serializada uma vez e colocada na fila de todos os
+    assinantes. Um assinante lento (fila cheia) perde as mudanças pendentes e
+    recebe um snapshot novo, sem atrasar os demais.
+    """
+
+    def __init__(self, max_subscribers: int, queue_size: int) -> None:
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._queues: set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+    def publish(self, row: dict) -> None:
+        """Chamado a partir de qualquer thread após uma escrita."""
+        loop = self._loop
+        if loop is None or not self._queues or loop.is_closed():
+            return
+        frame = sse("status", row)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(frame)
+        else:
+            loop.call_soon_threadsafe(self._fanout, frame)
+
+    def _fanout(self, frame: bytes) -> None:
+        for queue in self._queues:
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+                _resyncs.inc()
+
+    def subscribe(self) -> Optional[asyncio.Queue]:
+        if len(self._queues) >= self.max_subscribers:
+            return None
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues.add(queue)
+        _subscribers.set(len(self._queues))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._queues.discard(queue)
+        _subscribers.set(len(self._queues))
+
+    async def stream(self, queue: asyncio.Queue, snapshot: Callable[[], list[dict]]) -> AsyncIterator[bytes]:
+        """Snapshot inicial, depois as mudanças; comentário de heartbeat quando ocioso.
+
+        A conexão é encerrada após MACHINE_STREAM_MAX_SECONDS (o EventSource
+        reconecta sozinho), o que também limita a espera no encerramento do servidor.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.MACHINE_STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {settings.MACHINE_STREAM_RETRY_MS}\n\n".encode("utf-8")
+            # Já inscrito: mudanças durante a consulta ficam na fila e chegam depois do snapshot
+            yield sse("snapshot", await run_in_threadpool(snapshot))
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    frame = await asyncio.wait_for(
+                        queue.get(), min(remaining, settings.MACHINE_STREAM_HEARTBEAT_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                if frame is _RESYNC:
+                    frame = sse("snapshot", await run_in_threadpool(snapshot))
+                yield frame
+        finally:
+            self.unsubscribe(queue)
+
+
+class StatusStreamResponse(StreamingResponse):
+    """Resposta SSE de um assinante; a inscrição é cancelada ao fim da resposta.
+
+    O `finally` do gerador não roda se o cliente desconectar antes do
+    streaming começar, por isso a limpeza cobre a vida toda da resposta.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        broadcaster: StatusBroadcaster,
+        queue: asyncio.Queue,
+        snapshot: Callable[[], list[dict]],
+        headers: Optional[dict] = None,
+    ) -> None:
+        super().__init__(broadcaster.stream(queue, snapshot), headers=headers)
+        self.broadcaster = broadcaster
+        self.queue = queue
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.broadcaster.unsubscribe(self.queue)
+
+
+broadcaster = StatusBroadcaster(settings.MACHINE_STREAM_MAX_SUBSCRIBERS, settings.MACHINE_STREAM_QUEUE_SIZE)
+status_board.add_listener(broadcaster.publish)
@@ -0,0 +1,87 @@
+import hashlib
+import os
+from threading import Lock
+from typing import NamedTuple, Optional
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+from starlette.requests import Request
+from starlette.responses import Response
+from ..core.config import settings
+from .http_cache import ENCODINGS, compress, etag_matches, negotiate
+from .static_assets import static_assets
+
+# Páginas não dependem do usuário: o cliente guarda, mas revalida a cada acesso (304 se nada mudou)
+PAGE_CACHE_CONTROL = "public, no-cache"
+
+
+class RenderedPage(NamedTuple):
+    template: Template
+    digest: str
+    bodies: dict[Optional[str], bytes]  # None = sem compressão
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    if not settings.JINJA_BYTECODE_CACHE_DIR:
+        return None
+    os.makedirs(settings.JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(settings.JINJA_BYTECODE_CACHE_DIR)
+
+
+class PageCache:
+    """Páginas da UI renderizadas uma vez, com as versões gzip/brotli prontas.
+
+    Os templates não recebem contexto, então o HTML só muda com o arquivo: com
+    `auto_reload` (desenvolvimento) o template é conferido a cada acesso e
+    renderizado de novo quando alterado.
+    """
+
+    def __init__(self, directory: str, auto_reload: bool = False) -> None:
+        self.auto_reload = auto_reload
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html", "xml"]),
+            auto_reload=auto_reload,
+            bytecode_cache=_bytecode_cache(),
+        )
+        # URLs de estáticos com hash do conteúdo (cache longo no navegador)
+        self.env.globals["static_url"] = static_assets.url
+        self._pages: dict[str, RenderedPage] = {}
+        self._lock = Lock()
+
+    def render(self, name: str) -> RenderedPage:
+        template = self.env.get_template(name)
+        body = template.render().encode("utf-8")
+        bodies: dict[Optional[str], bytes] = {None: body}
+        for encoding in ENCODINGS:
+            compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                bodies[encoding] = compressed
+        page = RenderedPage(template, hashlib.sha256(body).hexdigest()[:24], bodies)
+        with self._lock:
+            self._pages[name] = page
+        return page
+
+    def preload(self) -> None:
+        for name in self.env.list_templates(extensions=["html"]):
+            self.render(name)
+
+    def get(self, name: str) -> RenderedPage:
+        page = self._pages.get(name)
+        if page is None or (self.auto_reload and not page.template.is_up_to_date):
+            page = self.render(name)
+        return page
+
+    def response(self, name: str, request: Request) -> Response:
+        page = self.get(name)
+        encoding = negotiate(request.headers.get("accept-encoding"), page.bodies)
+        # ETag forte por representação: cada codificação tem bytes diferentes
+        etag = f'"{page.digest}-{encoding}"' if encoding else f'"{page.digest}"'
+        headers = {"ETag": etag, "Cache-Control": PAGE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if_none_match = request.headers.get("if-none-match")
+        if any(etag_matches(if_none_match, f'"{page.digest}{"-" + e if e else ""}"') for e in page.bodies):
+            return Response(status_code=304, headers=headers)
+        return Response(content=page.bodies[encoding], media_type="text/html", headers=headers)
+
+
+pages = PageCache("app/templates", auto_reload=settings.PAGES_AUTO_RELOAD)
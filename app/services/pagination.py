@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import Response
+
+# Cabeçalho com o cursor da próxima página (corpo continua sendo a lista)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """Cursor opaco (base64url de JSON) com a chave de ordenação da última linha."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decodifica o cursor; levanta ValueError se estiver malformado."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("cursor inválido") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("cursor inválido")
+    return values
+
+
+def page(rows: list, limit: int, response: Response, key) -> list:
+    """Corta a página (consultada com limit + 1) e publica o cursor se houver próxima."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
+
+
+def parse_datetime(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError("cursor inválido")
+    return datetime.fromisoformat(value)
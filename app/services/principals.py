@@ -0,0 +1,137 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple, Optional
+from prometheus_client import Counter
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from ..core.config import settings
+from ..models.user import User, UserRole
+
+_lookups = Counter("vd_auth_principal_lookups_total", "Resolução do usuário autenticado", ["result"])  # hit|miss|claim
+
+
+class Principal(NamedTuple):
+    """Usuário autenticado, desacoplado da sessão do banco."""
+
+    id: int
+    email: str
+    name: str
+    role: UserRole
+
+
+def principal_from_user(user: User) -> Principal:
+    return Principal(user.id, user.email, user.name, UserRole(user.role))
+
+
+class PrincipalCache:
+    """Cache LRU com TTL de Principal por e-mail (subject do token)."""
+
+    def __init__(self, ttl: int, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, email: str) -> Optional[Principal]:
+        with self._lock:
+            item = self._items.get(email)
+            if item is None:
+                return None
+            expires, principal = item
+            if time.monotonic() >= expires:
+                del self._items[email]
+                return None
+            self._items.move_to_end(email)
+            return principal
+
+    def put(self, principal: Principal) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[principal.email] = (time.monotonic() + self.ttl, principal)
+            self._items.move_to_end(principal.email)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def invalidate(self, email: str) -> None:
+        with self._lock:
+            self._items.pop(email, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+principal_cache = PrincipalCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def resolve(db: Session, payload: dict) -> Optional[Principal]:
+    """Principal do token: claims assinadas (AUTH_ROLE_CLAIM), cache ou consulta ao banco."""
+    email = payload["sub"]
+    role, uid = payload.get("role"), payload.get("uid")
+    if settings.AUTH_ROLE_CLAIM and role and uid is not None:
+        try:
+            principal = Principal(int(uid), email, payload.get("name", ""), UserRole(role))
+        except ValueError:
+            principal = None
+        if principal is not None:
+            _lookups.labels("claim").inc()
+            return principal
+    principal = principal_cache.get(email)
+    if principal is not None:
+        _lookups.labels("hit").inc()
+        return principal
+    _lookups.labels("miss").inc()
+    user = db.query(User).filter(User.email == email).first()
+    if user is None:
+        return None
+    principal = principal_from_user(user)
+    principal_cache.put(principal)
+    return principal
+
+
+def token_claims(user: User) -> dict:
+    """Claims extras do token de acesso quando AUTH_ROLE_CLAIM está ativo."""
+    if not settings.AUTH_ROLE_CLAIM:
+        return {}
+    return {"uid": user.id, "role": UserRole(user.role).value, "name": user.name}
+
+
+# Invalidação: alterações de senha, papel, e-mail ou remoção de usuário em
+# qualquer sessão ORM tiram o e-mail do cache depois do commit
+_PENDING = "principal_invalidations"
+
+
+def _mark(target: User, *attrs: str) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    state = inspect(target)
+    emails = session.info.setdefault(_PENDING, set())
+    emails.add(target.email)
+    for attr in attrs:
+        emails.update(v for v in state.attrs[attr].history.deleted if isinstance(v, str))
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(_mapper, _connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[a].history.has_changes() for a in ("hashed_password", "role", "email", "name")):
+        _mark(target, "email")
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(_mapper, _connection, target: User) -> None:
+    _mark(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    for email in session.info.pop(_PENDING, ()):
+        principal_cache.invalidate(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,169 @@
+import logging
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from ..models.product import Product
+
+logger = logging.getLogger("product_search")
+
+# Índice FTS5 (tokenizer trigram) com conteúdo externo na tabela products;
+# triggers mantêm o índice em sincronia em qualquer escrita (API, scripts, seed)
+_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        code, name, description, location,
+        content='products', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, code, name, description, location)
+        VALUES (new.id, new.code, new.name, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, code, name, description, location)
+        VALUES ('delete', old.id, old.code, old.name, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF code, name, description, location ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, code, name, description, location)
+        VALUES ('delete', old.id, old.code, old.name, old.description, old.location);
+        INSERT INTO products_fts(rowid, code, name, description, location)
+        VALUES (new.id, new.code, new.name, new.description, new.location);
+    END
+    """,
+)
+# Pesos do bm25 por coluna: code, name, description, location
+_RANK = "bm25(products_fts, 10.0, 5.0, 1.0, 1.0)"
+# Similaridade mínima (trigramas em comum) para aceitar um resultado com erro de digitação
+_TYPO_MIN_SIMILARITY = 0.3
+_TYPO_CANDIDATES = 200
+
+_available = False
+
+
+def ensure_index(engine: Engine) -> bool:
+    """Cria índice e triggers (SQLite com FTS5/trigram); popula na primeira criação."""
+    global _available
+    if engine.dialect.name != "sqlite":
+        return False
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'")).first()
+            for ddl in _DDL:
+                conn.execute(text(ddl))
+            if not exists:
+                conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+        _available = True
+    except Exception:  # noqa: BLE001
+        logger.warning("fts5_trigram_unavailable; busca usa LIKE", exc_info=True)
+        _available = False
+    return _available
+
+
+def rebuild(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+
+def _phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _trigrams(value: str) -> set[str]:
+    value = value.lower()
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+def _similarity(query: set[str], value: Optional[str]) -> float:
+    if not value or not query:
+        return 0.0
+    grams = _trigrams(value)
+    return len(query & grams) / len(query) if grams else 0.0
+
+
+def search_ids(db: Session, q: str, limit: int, skip: int = 0) -> list[int]:
+    """IDs de produtos em ordem de relevância.
+
+    Caminhos, do mais forte ao mais fraco: código exato, prefixo de código
+    (índice único), palavras no índice trigram (bm25) e, se não houver
+    nenhum resultado, trigramas isolados com filtro de similaridade
+    (tolera erros de digitação).
+    """
+    q = q.strip()
+    wanted = skip + limit
+    ranked: list[int] = []
+    seen: set[int] = set()
+
+    def _add(ids) -> bool:
+        for pid in ids:
+            if pid not in seen:
+                seen.add(pid)
+                ranked.append(pid)
+        return len(ranked) >= wanted
+
+    if not q:
+        return []
+    exact = db.query(Product.id).filter(Product.code.in_({q, q.upper()})).all()
+    if _add(pid for (pid,) in exact):
+        return ranked[skip:wanted]
+    # Prefixo de código como faixa no índice único (case-sensitive)
+    prefix_ids = []
+    for prefix in dict.fromkeys((q, q.upper())):
+        prefix_ids += [
+            pid
+            for (pid,) in db.query(Product.id)
+            .filter(Product.code >= prefix, Product.code < prefix + "\U0010ffff")
+            .order_by(Product.code)
+            .limit(wanted)
+        ]
+    if _add(prefix_ids):
+        return ranked[skip:wanted]
+
+    if not _available or len(q) < 3:
+        # Trigram exige ao menos 3 caracteres; mesmo LIKE de substring de sempre (ex.: "01" acha SKU001)
+        like = f"%{q}%"
+        rows = (
+            db.query(Product.id)
+            .filter((Product.name.ilike(like)) | (Product.code.ilike(like)))
+            .order_by(Product.name.asc())
+            .limit(wanted)
+        )
+        _add(pid for (pid,) in rows)
+        return ranked[skip:wanted]
+
+    # Palavras em qualquer ordem; as curtas (< 3, fora do alcance do trigram) filtram por LIKE
+    words = q.split()
+    terms = [w for w in words if len(w) >= 3] or [q]
+    short = [w for w in words if len(w) < 3]
+    sql = "SELECT rowid FROM products_fts WHERE products_fts MATCH :q"
+    params: dict = {"q": " ".join(_phrase(t) for t in terms), "n": wanted}
+    for i, word in enumerate(short):
+        sql += f" AND (code LIKE :s{i} OR name LIKE :s{i})"
+        params[f"s{i}"] = f"%{word}%"
+    rows = db.execute(text(f"{sql} ORDER BY {_RANK} LIMIT :n"), params)
+    _add(pid for (pid,) in rows)
+    if ranked or len(q) < 4:
+        return ranked[skip:wanted]
+
+    query_grams = _trigrams(q)
+    match = " OR ".join(_phrase(g) for g in sorted(query_grams))
+    candidates = db.execute(
+        text(
+            "SELECT rowid, code, name FROM products_fts WHERE products_fts MATCH :q "
+            f"ORDER BY {_RANK} LIMIT :n"
+        ),
+        {"q": match, "n": _TYPO_CANDIDATES},
+    ).all()
+    scored = [
+        (max(_similarity(query_grams, code), _similarity(query_grams, name)), pid)
+        for pid, code, name in candidates
+        if pid not in seen
+    ]
+    scored.sort(key=lambda s: -s[0])
+    _add(pid for score, pid in scored if score >= _TYPO_MIN_SIMILARITY)
+    return ranked[skip:wanted]
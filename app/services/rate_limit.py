@@ -0,0 +1,198 @@
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock, local
+from typing import NamedTuple
+from ..core.config import settings
+
+
+class _Window(NamedTuple):
+    """Contadores de uma chave: janela fixa atual, a anterior e o bloqueio."""
+
+    start: float
+    current: int
+    previous: int
+    locked_until: float
+
+
+_EMPTY = _Window(0.0, 0, 0, 0.0)
+
+
+def _slide(state: _Window, now: float, window: int) -> _Window:
+    start = now - now % window
+    if state.start == start:
+        return state
+    previous = state.current if state.start == start - window else 0
+    return _Window(start, 0, previous, state.locked_until)
+
+
+def _estimate(state: _Window, now: float, window: int) -> float:
+    """Falhas na janela deslizante, ponderando a janela anterior pelo trecho ainda coberto."""
+    return state.previous * (1 - (now - state.start) / window) + state.current
+
+
+def _fail(state: _Window, now: float, window: int, limit: int, lockout: int) -> _Window:
+    state = _slide(state, now, window)
+    state = state._replace(current=state.current + 1)
+    if _estimate(state, now, window) >= limit:
+        # Bloqueia e zera: ao fim do bloqueio a contagem recomeça
+        return _Window(state.start, 0, 0, now + lockout)
+    return state
+
+
+def _expired(state: _Window, now: float, window: int) -> bool:
+    return state.locked_until <= now and state.start < now - 2 * window
+
+
+class MemoryBackend:
+    """Contadores no processo: LRU com limite de chaves e varredura periódica."""
+
+    def __init__(self, max_keys: int, sweep_seconds: int) -> None:
+        self.max_keys = max_keys
+        self.sweep_seconds = sweep_seconds
+        self._items: OrderedDict[str, _Window] = OrderedDict()
+        self._lock = Lock()
+        self._last_sweep = 0.0
+
+    def locked_until(self, key: str) -> float:
+        with self._lock:
+            state = self._items.get(key)
+            return state.locked_until if state else 0.0
+
+    def fail(self, key: str, now: float, window: int, limit: int, lockout: int) -> _Window:
+        with self._lock:
+            self._sweep(now, window)
+            state = _fail(self._items.get(key, _EMPTY), now, window, limit, lockout)
+            self._items[key] = state
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_keys:
+                self._items.popitem(last=False)
+            return state
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def _sweep(self, now: float, window: int) -> None:
+        if now - self._last_sweep < self.sweep_seconds:
+            return
+        self._last_sweep = now
+        for key in [k for k, state in self._items.items() if _expired(state, now, window)]:
+            del self._items[key]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteBackend:
+    """Contadores em um arquivo SQLite compartilhado entre workers (sem serviço externo)."""
+
+    def __init__(self, path: str, max_keys: int, sweep_seconds: int) -> None:
+        self.path = path
+        self.max_keys = max_keys
+        self.sweep_seconds = sweep_seconds
+        self._local = local()
+        self._last_sweep = 0.0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, start REAL, current INTEGER, previous INTEGER, locked_until REAL, touched REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_touched ON rate_limits(touched)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def locked_until(self, key: str) -> float:
+        row = self._conn().execute("SELECT locked_until FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0.0
+
+    def fail(self, key: str, now: float, window: int, limit: int, lockout: int) -> _Window:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT start, current, previous, locked_until FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state = _fail(_Window(*row) if row else _EMPTY, now, window, limit, lockout)
+            conn.execute(
+                "INSERT INTO rate_limits (key, start, current, previous, locked_until, touched) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET start = excluded.start, current = excluded.current, "
+                "previous = excluded.previous, locked_until = excluded.locked_until, touched = excluded.touched",
+                (key, *state, now),
+            )
+            if row is None:
+                # Chave nova: mantém o limite removendo as menos recentes
+                (count,) = conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()
+                if count > self.max_keys:
+                    conn.execute(
+                        "DELETE FROM rate_limits WHERE key IN (SELECT key FROM rate_limits ORDER BY touched LIMIT ?)",
+                        (count - self.max_keys,),
+                    )
+            if now - self._last_sweep >= self.sweep_seconds:
+                self._last_sweep = now
+                conn.execute(
+                    "DELETE FROM rate_limits WHERE locked_until <= ? AND start < ?", (now, now - 2 * window)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return state
+
+    def reset(self, key: str) -> None:
+        self._conn().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    """Limite de falhas por chave em janela deslizante, com bloqueio temporário.
+
+    Cada chave ocupa tamanho fixo (duas janelas fixas + fim do bloqueio),
+    independente do número de tentativas.
+    """
+
+    def __init__(self, backend, limit: int, window: int, lockout: int) -> None:
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.lockout = lockout
+
+    def is_locked(self, key: str, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        return self.backend.locked_until(key) > now
+
+    def failure(self, key: str, now: float | None = None) -> bool:
+        """Registra uma falha; retorna True se a chave ficou bloqueada."""
+        now = time.time() if now is None else now
+        state = self.backend.fail(key, now, self.window, self.limit, self.lockout)
+        return state.locked_until > now
+
+    def reset(self, key: str) -> None:
+        self.backend.reset(key)
+
+
+def _backend():
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBackend(settings.RATE_LIMIT_SQLITE_PATH, settings.RATE_LIMIT_MAX_KEYS, settings.RATE_LIMIT_SWEEP_SECONDS)
+    return MemoryBackend(settings.RATE_LIMIT_MAX_KEYS, settings.RATE_LIMIT_SWEEP_SECONDS)
+
+
+login_limiter = RateLimiter(
+    _backend(),
+    settings.LOGIN_MAX_ATTEMPTS,
+    settings.LOGIN_WINDOW_SECONDS,
+    settings.LOGIN_LOCKOUT_SECONDS,
+)
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, NamedTuple
+from prometheus_client import Counter, Gauge
+
+_requests = Counter("vd_response_cache_requests_total", "Consultas ao cache de respostas", ["cache", "result"])  # hit|miss|shared
+_hit_ratio = Gauge("vd_response_cache_hit_ratio", "Fração de respostas servidas pelo cache desde o início", ["cache"])
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def encode(content) -> CachedResponse:
+    body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CachedResponse(body, f'"{hashlib.sha256(body).hexdigest()[:24]}"')
+
+
+class ResponseCache:
+    """Cache LRU com TTL de respostas JSON já serializadas, com single-flight.
+
+    A chave deve incluir as gerações dos dados usados (services.generations):
+    uma escrita muda a chave e a entrada antiga só sai por TTL/LRU. O TTL cobre
+    o que não depende de escrita (janelas relativas a "agora"). Consultas
+    simultâneas à mesma chave ausente aguardam um único cálculo.
+    """
+
+    def __init__(self, name: str, ttl: int, max_entries: int) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._items: OrderedDict[Hashable, tuple[float, CachedResponse]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._hits = 0
+        self._total = 0
+        _hit_ratio.labels(name).set_function(lambda: self._hits / self._total if self._total else 0.0)
+
+    def _count(self, result: str) -> None:
+        self._total += 1
+        if result != "miss":
+            self._hits += 1
+        _requests.labels(self.name, result).inc()
+
+    def _get(self, key: Hashable):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires, response = item
+        if time.monotonic() >= expires:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return response
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable]) -> CachedResponse:
+        if self.ttl <= 0:
+            self._count("miss")
+            return encode(await compute())
+        response = self._get(key)
+        if response is not None:
+            self._count("hit")
+            return response
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count("shared")
+            return await asyncio.shield(inflight)
+        self._count("miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = encode(await compute())
+            future.set_result(response)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Evita aviso de exceção não consumida quando ninguém aguardava
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                # Cálculo cancelado: quem aguardava também é cancelado
+                future.cancel()
+        self._items[key] = (time.monotonic() + self.ttl, response)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+        return response
+
+    def clear(self) -> None:
+        self._items.clear()
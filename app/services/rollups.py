@@ -0,0 +1,179 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..models.machine import ProductionEvent, StopReason
+from ..models.rollup import MachineHourlyRollup, MachineDailyRollup, STOP_REASON_COLUMNS
+from . import generations
+
+COUNTER_COLUMNS = (
+    "event_count",
+    "produced_qty",
+    "operating_seconds",
+    "stopped_seconds",
+    "stop_count",
+    *STOP_REASON_COLUMNS.values(),
+)
+
+_HOUR = timedelta(hours=1)
+_DAY = timedelta(days=1)
+
+
+def hour_floor(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def day_floor(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil(value: datetime, floor, step: timedelta) -> datetime:
+    base = floor(value)
+    return base if base == value else base + step
+
+
+def event_contribution(
+    status: str,
+    stop_reason: Optional[StopReason],
+    started_at: datetime,
+    ended_at: Optional[datetime],
+    quantity: Optional[int],
+) -> dict:
+    """Incrementos que um evento soma ao balde do seu started_at."""
+    values = {"event_count": 1, "produced_qty": quantity or 0}
+    if ended_at is not None:
+        seconds = (ended_at - started_at).total_seconds()
+        if status == "operating":
+            values["operating_seconds"] = seconds
+        elif status == "stopped":
+            values["stopped_seconds"] = seconds
+    if status == "stopped":
+        values["stop_count"] = 1
+        if stop_reason:
+            values[STOP_REASON_COLUMNS[StopReason(stop_reason)]] = 1
+    return values
+
+
+def _upsert(db: Session, model, machine_id: int, bucket_start: datetime, values: dict) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        table = model.__table__
+        row = {column: 0 for column in COUNTER_COLUMNS}
+        row.update(values)
+        stmt = insert(table).values(machine_id=machine_id, bucket_start=bucket_start, **row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["machine_id", "bucket_start"],
+            set_={column: table.c[column] + stmt.excluded[column] for column in values},
+        )
+        db.execute(stmt)
+        return
+    rollup = db.query(model).filter(model.machine_id == machine_id, model.bucket_start == bucket_start).first()
+    if rollup is None:
+        rollup = model(machine_id=machine_id, bucket_start=bucket_start, **{c: 0 for c in COUNTER_COLUMNS})
+        db.add(rollup)
+    for column, value in values.items():
+        setattr(rollup, column, getattr(rollup, column) + value)
+
+
+def _accumulate(events: Iterable) -> dict:
+    totals: dict = defaultdict(lambda: defaultdict(int))
+    for e in events:
+        values = event_contribution(e.status, e.stop_reason, e.started_at, e.ended_at, e.quantity)
+        for model, floor in ((MachineHourlyRollup, hour_floor), (MachineDailyRollup, day_floor)):
+            bucket = totals[(model, e.machine_id, floor(e.started_at))]
+            for column, value in values.items():
+                bucket[column] += value
+    return totals
+
+
+def record_events(db: Session, events: Iterable) -> None:
+    """Soma novos eventos aos rollups na transação corrente (sem commit)."""
+    for (model, machine_id, bucket_start), values in _accumulate(events).items():
+        _upsert(db, model, machine_id, bucket_start, dict(values))
+
+
+def record_event(db: Session, event: ProductionEvent) -> None:
+    record_events(db, [event])
+
+
+def rebuild(db: Session, batch_size: int = 5000) -> int:
+    """Recalcula todos os rollups a partir de production_events. Retorna o nº de eventos lidos."""
+    db.query(MachineHourlyRollup).delete(synchronize_session=False)
+    db.query(MachineDailyRollup).delete(synchronize_session=False)
+    rows = db.query(
+        ProductionEvent.machine_id,
+        ProductionEvent.status,
+        ProductionEvent.stop_reason,
+        ProductionEvent.started_at,
+        ProductionEvent.ended_at,
+        ProductionEvent.quantity,
+    ).yield_per(batch_size)
+    count = 0
+
+    def _counted() -> Iterator:
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    totals = _accumulate(_counted())
+    for model in (MachineHourlyRollup, MachineDailyRollup):
+        mappings = [
+            {"machine_id": machine_id, "bucket_start": bucket_start, **{c: values.get(c, 0) for c in COUNTER_COLUMNS}}
+            for (m, machine_id, bucket_start), values in totals.items()
+            if m is model
+        ]
+        db.bulk_insert_mappings(model, mappings)
+    # Invalida respostas em cache calculadas a partir dos rollups antigos
+    generations.bump(db, generations.PRODUCTION)
+    db.commit()
+    return count
+
+
+def bucket_totals(db: Session, start: datetime) -> Iterator[tuple[datetime, dict]]:
+    """Totais por balde para eventos com started_at >= start.
+
+    A janela é coberta por eventos brutos até a próxima hora cheia, rollups
+    horários até o próximo dia e rollups diários daí em diante, de modo que o
+    custo depende do tamanho da janela e não do histórico.
+    """
+    first_hour = _ceil(start, hour_floor, _HOUR)
+    first_day = _ceil(first_hour, day_floor, _DAY)
+
+    edge = db.query(
+        ProductionEvent.status,
+        ProductionEvent.stop_reason,
+        ProductionEvent.started_at,
+        ProductionEvent.ended_at,
+        ProductionEvent.quantity,
+    ).filter(ProductionEvent.started_at >= start, ProductionEvent.started_at < first_hour)
+    for e in edge:
+        yield e.started_at, event_contribution(e.status, e.stop_reason, e.started_at, e.ended_at, e.quantity)
+
+    for model, lower, upper in (
+        (MachineHourlyRollup, first_hour, first_day),
+        (MachineDailyRollup, first_day, None),
+    ):
+        q = db.query(model.bucket_start, *[func.sum(getattr(model, c)).label(c) for c in COUNTER_COLUMNS]).filter(
+            model.bucket_start >= lower
+        )
+        if upper is not None:
+            q = q.filter(model.bucket_start < upper)
+        for row in q.group_by(model.bucket_start):
+            yield row.bucket_start, {c: getattr(row, c) or 0 for c in COUNTER_COLUMNS}
+
+
+def open_event_seconds(db: Session, start: datetime, now: datetime) -> dict[str, float]:
+    """Duração até agora dos eventos ainda em aberto (ended_at nulo), por status."""
+    totals: dict[str, float] = defaultdict(float)
+    rows = db.query(ProductionEvent.status, ProductionEvent.started_at).filter(
+        ProductionEvent.ended_at.is_(None), ProductionEvent.started_at >= start
+    )
+    for status, started_at in rows:
+        totals[status] += (now - started_at).total_seconds()
+    return totals
@@ -0,0 +1,119 @@
+import hashlib
+import mimetypes
+import os
+import re
+from typing import NamedTuple, Optional
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+from ..core.config import settings
+from .http_cache import ENCODINGS, compress, etag_matches, negotiate
+
+# URL com hash do conteúdo: pode ficar em cache para sempre
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Nome sem hash (links antigos, favicon pedido pelo navegador): revalida sempre
+PLAIN_CACHE_CONTROL = "public, no-cache"
+_HASHED = re.compile(r"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{12})(?P<ext>\.[^./]+)$")
+_TEXT_TYPES = ("text/", "image/svg+xml", "application/javascript", "application/json")
+
+
+class Asset(NamedTuple):
+    path: str
+    digest: str
+    mtime: float
+    media_type: str
+    bodies: dict[Optional[str], bytes]  # None = sem compressão
+
+
+class StaticAssets:
+    """Arquivos de `app/static` em memória, com versões gzip/brotli prontas.
+
+    `url("styles.css")` devolve `/static/styles.<hash>.css`; esse endereço é
+    servido com cache de longa duração. O nome original continua acessível,
+    com ETag e revalidação. Com `auto_reload` o arquivo é relido quando muda.
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static", auto_reload: bool = False) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.auto_reload = auto_reload
+        self._assets: dict[str, Asset] = {}
+
+    def _load(self, path: str) -> Optional[Asset]:
+        full = os.path.join(self.directory, path)
+        try:
+            mtime = os.path.getmtime(full)
+            with open(full, "rb") as f:
+                body = f.read()
+        except OSError:
+            self._assets.pop(path, None)
+            return None
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        bodies: dict[Optional[str], bytes] = {None: body}
+        if media_type.startswith(_TEXT_TYPES):
+            for encoding in ENCODINGS:
+                compressed = compress(body, encoding)
+                if len(compressed) < len(body):
+                    bodies[encoding] = compressed
+        asset = Asset(path, hashlib.sha256(body).hexdigest()[:12], mtime, media_type, bodies)
+        self._assets[path] = asset
+        return asset
+
+    def preload(self) -> None:
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                self._load(os.path.relpath(os.path.join(root, name), self.directory).replace(os.sep, "/"))
+
+    def get(self, path: str) -> Optional[Asset]:
+        asset = self._assets.get(path)
+        # Em produção só o que foi carregado na inicialização; nada é lido do disco por requisição
+        if self.auto_reload:
+            full = os.path.join(self.directory, path)
+            if asset is None or not os.path.exists(full) or os.path.getmtime(full) != asset.mtime:
+                asset = self._load(path)
+        return asset
+
+    def url(self, path: str) -> str:
+        """URL versionada pelo conteúdo (uso nos templates: `{{ static_url('styles.css') }}`)."""
+        asset = self.get(path)
+        if asset is None:
+            return f"{self.prefix}/{path}"
+        stem, ext = os.path.splitext(path)
+        return f"{self.prefix}/{stem}.{asset.digest}{ext}"
+
+    def response(self, path: str, request: Request) -> Response:
+        if ".." in path.split("/"):
+            return PlainTextResponse("Not Found", status_code=404)
+        match = _HASHED.match(path)
+        asset = self.get(match["stem"] + match["ext"]) if match else None
+        # Hash antigo (deploy novo) serve o conteúdo atual, mas sem cache longo
+        immutable = asset is not None and asset.digest == match["digest"]
+        if asset is None:
+            asset = self.get(path)
+        if asset is None:
+            return PlainTextResponse("Not Found", status_code=404)
+        encoding = negotiate(request.headers.get("accept-encoding"), asset.bodies)
+        etag = f'"{asset.digest}-{encoding}"' if encoding else f'"{asset.digest}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else PLAIN_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if_none_match = request.headers.get("if-none-match")
+        if any(etag_matches(if_none_match, f'"{asset.digest}{"-" + e if e else ""}"') for e in asset.bodies):
+            return Response(status_code=304, headers=headers)
+        return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """App ASGI para `app.mount` (mesmo uso do StaticFiles)."""
+        request = Request(scope, receive)
+        if request.method not in ("GET", "HEAD"):
+            response: Response = PlainTextResponse("Method Not Allowed", status_code=405)
+        else:
+            response = self.response(scope["path"][len(scope.get("root_path", "")) :].lstrip("/"), request)
+        await response(scope, receive, send)
+
+
+static_assets = StaticAssets("app/static", auto_reload=settings.PAGES_AUTO_RELOAD)
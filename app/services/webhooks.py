@@ -0,0 +1,198 @@
+import asyncio
+import json
+import logging
+import os
+import random
+from collections import deque
+from datetime import datetime
+from threading import Lock
+from typing import Optional
+from prometheus_client import Counter, Gauge
+from ..core.config import settings
+
+logger = logging.getLogger("webhooks")
+
+_events = Counter("vd_webhook_events_total", "Eventos de webhook por resultado", ["result"])  # sent|dropped|failed|rejected
+_depth = Gauge("vd_webhook_queue_depth", "Eventos de webhook aguardando envio")
+
+
+class WebhookDispatcher:
+    """Envio de webhooks fora das requisições.
+
+    `enqueue` só coloca o evento em um buffer limitado (seguro para threads e
+    para o event loop); uma task do event loop envia em lotes com cliente HTTP
+    persistente, timeout e novas tentativas com backoff. Com o buffer cheio o
+    evento mais antigo é descartado. No encerramento o que não foi enviado vai
+    para o arquivo de spool, reenviado na próxima inicialização.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str],
+        max_pending: int,
+        batch_size: int,
+        batch_ms: int,
+        timeout: float,
+        max_retries: int,
+        spool_path: str,
+    ) -> None:
+        self.url = url
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_seconds = batch_ms / 1000
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.spool_path = spool_path
+        self._pending: deque[dict] = deque()
+        self._lock = Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: list[dict] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def depth(self) -> int:
+        return len(self._pending) + len(self._inflight)
+
+    def enqueue(self, event: str, **data) -> None:
+        if not self.enabled:
+            return
+        payload = {"event": event, "at": datetime.utcnow().isoformat(), **data}
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                _events.labels("dropped").inc()
+            self._pending.append(payload)
+        self._notify()
+
+    def _notify(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wakeup.set()
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _take(self) -> list[dict]:
+        with self._lock:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+        self._inflight = batch
+        return batch
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._load_spool()
+        self._task = asyncio.create_task(self._run(), name="webhooks")
+
+    async def _run(self) -> None:
+        import httpx
+
+        limits = httpx.Limits(max_connections=4, max_keepalive_connections=4)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            while True:
+                if not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if len(self._pending) < self.batch_size:
+                    # Aguarda um pouco para juntar eventos em um único POST
+                    await asyncio.sleep(self.batch_seconds)
+                batch = self._take()
+                if batch:
+                    await self._send(client, batch)
+                self._inflight = []
+
+    async def _send(self, client, batch: list[dict]) -> None:
+        body = batch[0] if self.batch_size == 1 else {"events": batch}
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.post(self.url, json=body)
+                if response.status_code < 400:
+                    _events.labels("sent").inc(len(batch))
+                    return
+                if response.status_code < 500 and response.status_code != 429:
+                    # Recusado pelo receptor: repetir não adianta
+                    _events.labels("rejected").inc(len(batch))
+                    logger.warning("webhook_rejected status=%s events=%d", response.status_code, len(batch))
+                    return
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("webhook_attempt_failed attempt=%d error=%s", attempt, exc)
+            if attempt < self.max_retries:
+                await asyncio.sleep(min(30.0, 0.5 * 2**attempt) * (0.5 + random.random()))
+        _events.labels("failed").inc(len(batch))
+        logger.warning("webhook_failed events=%d", len(batch))
+
+    def _load_spool(self) -> None:
+        try:
+            with open(self.spool_path, encoding="utf-8") as f:
+                events = [json.loads(line) for line in f if line.strip()]
+            os.unlink(self.spool_path)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.exception("webhook_spool_unreadable path=%s", self.spool_path)
+            return
+        with self._lock:
+            self._pending.extendleft(reversed(events[-self.max_pending :]))
+        logger.info("webhook_spool_loaded events=%d", len(events))
+
+    def _write_spool(self, events: list[dict]) -> None:
+        if not events:
+            return
+        directory = os.path.dirname(self.spool_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+        logger.info("webhook_spool_written events=%d", len(events))
+
+    async def stop(self, drain_seconds: float = 5.0) -> None:
+        """Tenta esvaziar o buffer por alguns segundos e grava o restante no spool."""
+        if self._task is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + drain_seconds
+        while self.depth() and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        with self._lock:
+            remaining = self._inflight + list(self._pending)
+            self._pending.clear()
+        self._inflight = []
+        self._write_spool(remaining)
+        self._task = None
+        self._loop = self._wakeup = None
+
+
+webhooks = WebhookDispatcher(
+    settings.WEBHOOK_URL,
+    settings.WEBHOOK_MAX_PENDING,
+    settings.WEBHOOK_BATCH_SIZE,
+    settings.WEBHOOK_BATCH_MS,
+    settings.WEBHOOK_TIMEOUT_SECONDS,
+    settings.WEBHOOK_MAX_RETRIES,
+    settings.WEBHOOK_SPOOL_PATH,
+)
+_depth.set_function(webhooks.depth)
+
+
+def notify_low_stock(code: str, name: str, previous: int, quantity: int) -> None:
+    """Avisa quando o estoque cruza LOW_STOCK_THRESHOLD para baixo (uma vez por cruzamento)."""
+    threshold = settings.LOW_STOCK_THRESHOLD
+    if threshold >= 0 and previous > threshold >= quantity:
+        webhooks.enqueue("low_stock", code=code, name=name, quantity=quantity, threshold=threshold)
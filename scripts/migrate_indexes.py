@@ -0,0 +1,27 @@
+from sqlalchemy import inspect, text
+from app.db.base import Base
+from app.db.session import engine
+from app.models.machine import ProductionEvent
+
+
+def _columns(table: str) -> dict[str, list[str]]:
+	return {ix["name"]: ix["column_names"] for ix in inspect(engine).get_indexes(table)}
+
+
+# Recria índices cuja definição mudou: create_all não altera índices já existentes
+with engine.begin() as conn:
+	existing = _columns(ProductionEvent.__tablename__)
+	for index in ProductionEvent.__table__.indexes:
+		expected = [c.name for c in index.columns]
+		if index.name in existing and existing[index.name] != expected:
+			conn.execute(text(f"DROP INDEX {index.name}"))
+			print(f"Índice {index.name} removido ({', '.join(existing[index.name])}).")
+	# Nome usado por versões intermediárias para (machine_id, started_at, id)
+	if "ix_production_events_machine_started_id" in existing:
+		conn.execute(text("DROP INDEX ix_production_events_machine_started_id"))
+		print("Índice ix_production_events_machine_started_id removido.")
+
+Base.metadata.create_all(bind=engine)
+for index in ProductionEvent.__table__.indexes:
+	index.create(bind=engine, checkfirst=True)
+print("Índices de production_events atualizados.")
@@ -0,0 +1,15 @@
+from app.db.session import SessionLocal
+from app.db.base import Base
+from app.db.session import engine
+from app.services.rollups import rebuild
+
+
+Base.metadata.create_all(bind=engine)
+
+db = SessionLocal()
+try:
+	# Recalcula rollups horários/diários a partir de todo o histórico de eventos
+	total = rebuild(db)
+	print(f"Rollups reconstruídos a partir de {total} eventos.")
+finally:
+	db.close()
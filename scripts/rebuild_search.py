@@ -0,0 +1,13 @@
+from app.db.base import Base
+from app.db.session import engine
+from app.services import product_search
+
+
+Base.metadata.create_all(bind=engine)
+
+# Cria (se preciso) e repopula o índice FTS de produtos a partir da tabela products
+if product_search.ensure_index(engine):
+	product_search.rebuild(engine)
+	print("Índice de busca de produtos reconstruído.")
+else:
+	print("FTS5/trigram indisponível neste banco; a busca usa LIKE.")
@@ -0,0 +1,77 @@
+"""Rotas concorrentes com DB_ASYNC=true não podem travar o event loop.
+
+Serviços chamados via run_db rodam na thread do loop (AsyncSession.run_sync);
+um threading.Lock segurado durante a consulta bloqueia o loop inteiro quando
+uma segunda requisição chega ao mesmo lock.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+
+_DB_DIR = tempfile.mkdtemp(prefix="vectradex-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["DB_ASYNC"] = "true"
+os.environ["MACHINE_STATUS_CACHE"] = "true"
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from app.api.routes import machines  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.machine import Machine  # noqa: E402
+from app.services.event_ingest import machine_directory  # noqa: E402
+from app.services.machine_status import status_board  # noqa: E402
+import app.models.generation, app.models.ingest, app.models.rollup  # noqa: E402,F401
+
+CONCURRENCY = 5
+TIMEOUT_SECONDS = 20
+
+Base.metadata.create_all(bind=engine)
+with SessionLocal() as _db:
+    _db.add_all([Machine(name=f"M{i}") for i in range(3)])
+    _db.commit()
+
+_app = FastAPI()
+_app.include_router(machines.router, prefix="/api/machines")
+
+
+def _run(requests) -> list[int]:
+    """Dispara as requisições juntas em outro thread; um loop travado não passa do join."""
+    statuses: list[int] = []
+
+    async def _main() -> None:
+        transport = httpx.ASGITransport(app=_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(request(client) for request in requests))
+        statuses.extend(r.status_code for r in responses)
+
+    thread = threading.Thread(target=asyncio.run, args=(_main(),), daemon=True)
+    thread.start()
+    thread.join(TIMEOUT_SECONDS)
+    assert not thread.is_alive(), "event loop travado"
+    return statuses
+
+
+def _batch(i: int):
+    events = [{"machine_id": 1 + i % 3, "started_at": f"2026-10-18T0{i}:00:00", "status": "operating"}]
+    return lambda client: client.post("/api/machines/events/batch", json=events)
+
+
+def test_batch_ingest_with_cold_machine_directory():
+    machine_directory._loaded_at = 0.0
+    machine_directory._machines = {}
+    assert _run([_batch(i) for i in range(CONCURRENCY)]) == [200] * CONCURRENCY
+
+
+def test_batch_ingest_with_unknown_machine():
+    unknown = [{"machine_id": 999, "started_at": "2026-10-18T01:00:00", "status": "operating"}]
+    requests = [lambda client: client.post("/api/machines/events/batch", json=unknown)] * CONCURRENCY
+    assert _run(requests) == [200] * CONCURRENCY
+
+
+def test_status_with_cold_cache():
+    status_board.enabled = True
+    status_board.invalidate()
+    requests = [lambda client: client.get("/api/machines/status")] * CONCURRENCY
+    assert _run(requests) == [200] * CONCURRENCY